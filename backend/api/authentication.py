@@ -0,0 +1,108 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from hashlib import md5
+
+from core.cache import cache_is_shared
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .metrics import AUTH_TOKEN_CACHE
+
+TOKEN_CACHE_KEY = "auth:token:{}"
+
+
+def token_cache_key(key):
+    """Ключ общего кэша без самого токена."""
+    return TOKEN_CACHE_KEY.format(md5(key.encode()).hexdigest())
+
+
+class TokenCache:
+    """
+    Токены с пользователями: LRU в памяти процесса с коротким TTL
+    поверх общего кэша. Сброс в других процессах доходит до их LRU
+    не позже чем через AUTH_TOKEN_LOCAL_TTL. Кэш в памяти процесса
+    (LocMemCache) вторым уровнем не используется: сброс до него
+    в других воркерах не дошел бы до AUTH_TOKEN_CACHE_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Токен с пользователем или None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                AUTH_TOKEN_CACHE.labels("local").inc()
+                return pickle.loads(entry[1])
+        data = cache.get(token_cache_key(key)) if cache_is_shared() else None
+        if data is None:
+            AUTH_TOKEN_CACHE.labels("miss").inc()
+            return None
+        AUTH_TOKEN_CACHE.labels("shared").inc()
+        self._remember(key, data, now)
+        return pickle.loads(data)
+
+    def set(self, key, token):
+        """Запомнить токен, загруженный вместе с пользователем."""
+        data = pickle.dumps(token, pickle.HIGHEST_PROTOCOL)
+        if cache_is_shared():
+            cache.set(
+                token_cache_key(key), data, settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+        self._remember(key, data, time.monotonic())
+
+    def _remember(self, key, data, now):
+        # Каждый запрос получает свою копию пользователя из байтов.
+        with self._lock:
+            self._entries[key] = (now + settings.AUTH_TOKEN_LOCAL_TTL, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_LOCAL_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        """Сбросить токены в этом процессе и в общем кэше."""
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if cache_is_shared():
+            cache.delete_many([token_cache_key(key) for key in keys])
+
+    def invalidate_users(self, user_ids):
+        """
+        Сбросить токены пользователей. Сигналы вызывают его сами, а после
+        записи без сигналов, например QuerySet.update(is_active=False),
+        его нужно вызвать явно.
+        """
+        self.invalidate(
+            Token.objects.filter(user__in=user_ids).values_list(
+                "key", flat=True
+            )
+        )
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к authtoken_token и auth_user
+    на каждый запрос. Кэш сбрасывается при удалении токена,
+    в том числе через token/logout, и при изменении пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return token.user, token
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token)
+        return user, token
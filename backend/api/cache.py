@@ -0,0 +1,50 @@
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+RECIPES_GENERATION_KEY = "recipes:generation"
+RECIPES_LIST_PARAMS = (
+    "page",
+    "limit",
+    "tags",
+    "author",
+    "pagination",
+    "cursor",
+    "search",
+    "ordering",
+)
+
+
+def get_recipes_generation():
+    """Текущее поколение кэша рецептов."""
+    generation = cache.get(RECIPES_GENERATION_KEY)
+    if generation is not None:
+        return generation
+    cache.add(RECIPES_GENERATION_KEY, time.time_ns(), timeout=None)
+    return cache.get(RECIPES_GENERATION_KEY)
+
+
+def bump_recipes_generation():
+    """Новое поколение: все закэшированные списки рецептов устаревают."""
+    try:
+        cache.incr(RECIPES_GENERATION_KEY)
+    except ValueError:
+        cache.add(RECIPES_GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def recipes_list_cache_key(request):
+    """
+    Ключ кэша списка рецептов по нормализованным параметрам запроса.
+    None, если в запросе есть параметры, которые не входят в ключ.
+    """
+    params = request.query_params
+    if set(params) - set(RECIPES_LIST_PARAMS):
+        return None
+    normalized = urlencode(
+        [(name, sorted(params.getlist(name))) for name in RECIPES_LIST_PARAMS],
+        doseq=True,
+    )
+    digest = md5(f"{request.get_host()}?{normalized}".encode()).hexdigest()
+    return f"recipes:list:{get_recipes_generation()}:{digest}"
@@ -0,0 +1,123 @@
+from calendar import timegm
+from functools import wraps
+from http import HTTPStatus
+
+from django.db.models import Exists, OuterRef
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from recipes.models import (
+    FavouriteRecipes,
+    Ingredients,
+    Recipes,
+    ShoppingLists,
+    TableVersions,
+    Tags,
+)
+from users.models import Follow
+
+from .indexes import ingredients_index
+
+CONDITIONAL_STATUSES = (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED)
+
+
+def conditional_get(stamp_func, vary=()):
+    """
+    Условный GET для методов вьюсета.
+    stamp_func(view, request, *args, **kwargs) возвращает пару
+    (etag, last_modified); при совпадении с If-None-Match или
+    If-Modified-Since отдается 304 без вызова метода и сериализатора.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = stamp_func(self, request, *args, **kwargs)
+            timestamp = (
+                timegm(last_modified.utctimetuple()) if last_modified else None
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in CONDITIONAL_STATUSES:
+                if etag:
+                    response["ETag"] = etag
+                if timestamp:
+                    response["Last-Modified"] = http_date(timestamp)
+                if vary:
+                    patch_vary_headers(response, vary)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def tags_stamp(view, request, *args, **kwargs):
+    """Версия справочника тегов."""
+    version, modified = TableVersions.objects.stamp(Tags._meta.db_table)
+    return f'W/"tags-{version}"', modified
+
+
+def ingredients_stamp(view, request, *args, **kwargs):
+    """Версия справочника ингредиентов в базе."""
+    version, modified = TableVersions.objects.stamp(
+        Ingredients._meta.db_table
+    )
+    return f'W/"ingredients-{version}"', modified
+
+
+def ingredients_index_stamp(view, request, *args, **kwargs):
+    """Версия справочника, по которой построен индекс этого процесса."""
+    version, modified = ingredients_index.stamp()
+    return f'W/"ingredients-{version}"', modified
+
+
+def recipe_stamp(view, request, pk=None, **kwargs):
+    """
+    Версия рецепта: время изменения, версии тегов и ингредиентов
+    и флаги текущего пользователя, которые попадают в ответ.
+    """
+    try:
+        recipes = Recipes.objects.filter(pk=pk)
+    except (TypeError, ValueError):
+        return None, None
+    fields = ["modified"]
+    user = request.user
+    if user.is_authenticated:
+        recipes = recipes.annotate(
+            is_favorited=Exists(
+                FavouriteRecipes.objects.filter(
+                    user=user, recipe=OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingLists.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef("author"))
+            ),
+        )
+        fields += ["is_favorited", "is_in_shopping_cart", "is_subscribed"]
+    row = recipes.values_list(*fields).first()
+    if row is None:
+        return None, None
+    modified, *flags = row
+    versions = dict(
+        TableVersions.objects.filter(
+            table__in=(Tags._meta.db_table, Ingredients._meta.db_table)
+        ).values_list("table", "version")
+    )
+    etag = "-".join(
+        str(part)
+        for part in (
+            "recipe",
+            pk,
+            f"{modified:%Y%m%d%H%M%S%f}",
+            versions.get(Tags._meta.db_table, 0),
+            versions.get(Ingredients._meta.db_table, 0),
+            *(int(flag) for flag in flags),
+        )
+    )
+    return f'W/"{etag}"', None
@@ -1,9 +1,16 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models import Case, F, IntegerField, Value, When
 from django_filters.fields import MultipleChoiceField
 from django_filters.rest_framework import CharFilter, FilterSet, filters
 from django_filters.widgets import BooleanWidget
 from recipes.models import Ingredients, Recipes
 
+from .indexes import recipe_ingredients_index
+from .search import search_recipes
+
 
 class TagsMultipleChoiceField(MultipleChoiceField):
     """Класс для фильтрации обьектов Tags."""
@@ -38,6 +45,22 @@ class IngredientsSearchFilter(FilterSet):
         fields = ("name",)
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Список чисел через запятую."""
+
+
+def coverage_case(groups):
+    """Значение для каждой группы id рецептов одним CASE."""
+    return Case(
+        *(
+            When(id__in=recipe_ids, then=Value(value))
+            for value, recipe_ids in groups.items()
+        ),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
 class RecipesFilter(FilterSet):
     """Класс для фильтрации обьектов Recipes."""
 
@@ -51,7 +74,63 @@ class RecipesFilter(FilterSet):
         widget=BooleanWidget(), label="В избранном."
     )
     tags = TagsFilter(field_name="tags__slug")
+    search = CharFilter(method="filter_search", label="Поиск")
+    ingredients = NumberInFilter(
+        method="filter_ingredients", label="Имеющиеся ингредиенты"
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ("popular", "Популярные"),
+            ("trending", "Набирающие популярность"),
+        ),
+        method="filter_ordering",
+        label="Сортировка",
+    )
 
     class Meta:
         model = Recipes
-        fields = ("author", "tags", "is_in_shopping_cart", "is_favorited")
+        fields = (
+            "author",
+            "tags",
+            "is_in_shopping_cart",
+            "is_favorited",
+            "search",
+            "ingredients",
+            "ordering",
+        )
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        """
+        Рецепты из имеющихся ингредиентов: сначала те, где не хватает
+        меньше всего, затем где больше совпадений.
+        """
+        coverage = recipe_ingredients_index.coverage(int(pk) for pk in value)
+        ranked = sorted(
+            coverage.items(), key=lambda item: (item[1][1], -item[1][0])
+        )[: settings.RECIPES_COVERAGE_LIMIT]
+        have, missing = defaultdict(list), defaultdict(list)
+        for recipe_id, (have_count, missing_count) in ranked:
+            have[have_count].append(recipe_id)
+            missing[missing_count].append(recipe_id)
+        return (
+            queryset.filter(id__in=[recipe_id for recipe_id, _ in ranked])
+            .annotate(
+                ingredients_have=coverage_case(have),
+                ingredients_missing=coverage_case(missing),
+            )
+            .order_by(
+                "ingredients_missing", "-ingredients_have", "-pud_date", "-id"
+            )
+        )
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Рецепты по убыванию рейтинга из RecipeRankings. Рецепты без
+        рейтинга, например созданные после пересчета, идут последними.
+        """
+        return queryset.order_by(
+            F(f"ranking__{value}").desc(nulls_last=True), "-pud_date", "-id"
+        )
@@ -0,0 +1,78 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+from recipes.models import Recipes
+
+from .cache import bump_recipes_generation
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = "image_recipes/variants"
+
+# Потоки пула запускаются только при первой отправке задачи.
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix="recipe-images",
+)
+
+
+def render_variant(image, size):
+    """Картинка, вписанная в квадрат size, в формате WebP."""
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, "WEBP", quality=settings.RECIPE_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_variants(recipe_id):
+    """Создать варианты картинки рецепта и записать их в рецепт."""
+    recipe = Recipes.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    values, old_names = {}, []
+    with recipe.image.open("rb") as file, Image.open(file) as image:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for variant, size in settings.RECIPE_IMAGE_SIZES.items():
+            field = f"image_{variant}"
+            values[field] = default_storage.save(
+                f"{VARIANTS_DIR}/{stem}_{variant}.webp",
+                ContentFile(render_variant(image, size)),
+            )
+            if getattr(recipe, field):
+                old_names.append(getattr(recipe, field).name)
+    updated = Recipes.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(modified=timezone.now(), **values)
+    for name in old_names if updated else values.values():
+        default_storage.delete(name)
+    if updated:
+        bump_recipes_generation()
+
+
+def run_generate_variants(recipe_id):
+    try:
+        generate_variants(recipe_id)
+    except Exception:
+        logger.exception(
+            "Не удалось обработать картинку рецепта %s", recipe_id
+        )
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe):
+    """Обработать картинку в фоне после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: executor.submit(run_generate_variants, recipe.pk)
+    )
@@ -0,0 +1,232 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from recipes.models import (
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    TableVersions,
+)
+
+from .cache import get_recipes_generation
+
+SYNC_BATCH_SIZE = 500
+# Рецепты, измененные незадолго до прошлой синхронизации, перечитываются:
+# их транзакция могла еще не завершиться.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class IngredientsIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Сначала совпадения по префиксу, затем по подстроке.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = None
+
+    def invalidate(self):
+        """Сбросить индекс, он будет перестроен при следующем запросе."""
+        self._built_at = None
+
+    def rebuild(self):
+        """Построить индекс по таблице Ingredients."""
+        stamp = TableVersions.objects.stamp(Ingredients._meta.db_table)
+        rows = Ingredients.objects.values("id", "name", "measurement_unit")
+        pairs = sorted(
+            ((row["name"].lower(), row) for row in rows),
+            key=lambda pair: (pair[0], pair[1]["id"]),
+        )
+        self._index = (
+            [key for key, _ in pairs],
+            [row for _, row in pairs],
+            stamp,
+        )
+        self._built_at = time.monotonic()
+
+    def _is_stale(self):
+        if self._index is None or self._built_at is None:
+            return True
+        age = time.monotonic() - self._built_at
+        return age > settings.INGREDIENTS_INDEX_TTL
+
+    def _ensure_built(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self.rebuild()
+
+    def stamp(self):
+        """Версия и время изменения справочника, по которым построен индекс."""
+        self._ensure_built()
+        return self._index[2]
+
+    def search(self, query=None, limit=None):
+        """Сериализованные ингредиенты, подходящие под запрос."""
+        self._ensure_built()
+        keys, rows, _ = self._index
+        query = (query or "").strip().lower()
+        if not query:
+            return rows
+        if limit is None:
+            limit = settings.INGREDIENTS_SEARCH_LIMIT
+        result = []
+        position = bisect_left(keys, query)
+        while (
+            position < len(keys)
+            and len(result) < limit
+            and keys[position].startswith(query)
+        ):
+            result.append(rows[position])
+            position += 1
+        if len(result) < limit:
+            for key, row in zip(keys, rows):
+                if query in key and not key.startswith(query):
+                    result.append(row)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+class RecipeIngredientsIndex:
+    """
+    Обратный индекс ингредиент → рецепты для подбора рецептов
+    по имеющимся продуктам. Списки рецептов хранятся в отсортированных
+    массивах. Измененные рецепты применяются к индексу при смене
+    поколения или раз в RECIPES_INDEX_SYNC_INTERVAL, раз
+    в RECIPE_INGREDIENTS_INDEX_TTL индекс строится заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._recipes = {}
+        self._generation = None
+        self._synced_at = None
+        self._built_at = None
+        self._checked_at = None
+
+    def _add(self, recipe_id, ingredient_ids):
+        ingredient_ids = array("I", sorted(set(ingredient_ids)))
+        self._recipes[recipe_id] = ingredient_ids
+        for ingredient_id in ingredient_ids:
+            insort(
+                self._postings.setdefault(ingredient_id, array("I")),
+                recipe_id,
+            )
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            posting = self._postings[ingredient_id]
+            position = bisect_left(posting, recipe_id)
+            if position < len(posting) and posting[position] == recipe_id:
+                posting.pop(position)
+            if not posting:
+                del self._postings[ingredient_id]
+
+    @staticmethod
+    def _read(recipe_ids=None):
+        """Ингредиенты рецептов recipe_ids (или всех) по рецептам."""
+        rows = IngredientsInRecipe.objects.values_list(
+            "recipe_id", "ingredient_id"
+        ).order_by()
+        if recipe_ids is None:
+            batches = (rows.iterator(),)
+        else:
+            recipe_ids, size = list(recipe_ids), SYNC_BATCH_SIZE
+            batches = (
+                rows.filter(recipe__in=recipe_ids[start:start + size])
+                for start in range(0, len(recipe_ids), size)
+            )
+        ingredients = {}
+        for batch in batches:
+            for recipe_id, ingredient_id in batch:
+                ingredients.setdefault(recipe_id, []).append(ingredient_id)
+        return ingredients
+
+    def rebuild(self):
+        """
+        Построить индекс заново по всем рецептам. Рецепты обходятся
+        по возрастанию id, поэтому их id добавляются в конец списков.
+        """
+        started = timezone.now()
+        ingredients = self._read()
+        postings, recipes = {}, {}
+        for recipe_id in sorted(ingredients):
+            ingredient_ids = array("I", sorted(set(ingredients[recipe_id])))
+            recipes[recipe_id] = ingredient_ids
+            for ingredient_id in ingredient_ids:
+                postings.setdefault(ingredient_id, array("I")).append(
+                    recipe_id
+                )
+        self._postings, self._recipes = postings, recipes
+        self._synced_at = started
+        self._built_at = time.monotonic()
+
+    def sync(self):
+        """
+        Применить к индексу рецепты, добавленные и измененные с прошлой
+        синхронизации, по индексу на Recipes.modified. Удаленные рецепты
+        убирает discard в процессе, где их удалили, в остальных они
+        остаются до перестроения и отсекаются запросом к БД.
+        """
+        started = timezone.now()
+        changed = list(
+            Recipes.objects.filter(
+                modified__gte=self._synced_at - SYNC_OVERLAP
+            ).values_list("id", flat=True)
+        )
+        ingredients = self._read(changed)
+        for recipe_id in changed:
+            self._remove(recipe_id)
+            self._add(recipe_id, ingredients.get(recipe_id, ()))
+        self._synced_at = started
+
+    def discard(self, recipe_id):
+        """Убрать удаленный рецепт из индекса."""
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _ensure_synced(self):
+        now = time.monotonic()
+        generation = get_recipes_generation()
+        if (
+            self._built_at is None
+            or now - self._built_at > settings.RECIPE_INGREDIENTS_INDEX_TTL
+        ):
+            self.rebuild()
+        elif (
+            generation != self._generation
+            or now - self._checked_at > settings.RECIPES_INDEX_SYNC_INTERVAL
+        ):
+            self.sync()
+        else:
+            return
+        self._generation, self._checked_at = generation, now
+
+    def coverage(self, ingredient_ids):
+        """
+        Рецепты, в которых есть хотя бы один из ингредиентов:
+        {id рецепта: (есть ингредиентов, не хватает ингредиентов)}.
+        """
+        with self._lock:
+            self._ensure_synced()
+            have = Counter()
+            for ingredient_id in set(ingredient_ids):
+                have.update(self._postings.get(ingredient_id, ()))
+            return {
+                recipe_id: (count, len(self._recipes[recipe_id]) - count)
+                for recipe_id, count in have.items()
+            }
+
+
+ingredients_index = IngredientsIndex()
+recipe_ingredients_index = RecipeIngredientsIndex()
@@ -0,0 +1,156 @@
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.http import StreamingHttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+UNRESOLVED_VIEW = "unresolved"
+
+if os.environ.get(MULTIPROCESS_DIR_ENV):
+    os.makedirs(os.environ[MULTIPROCESS_DIR_ENV], exist_ok=True)
+
+REQUESTS = Counter(
+    "foodgram_http_requests",
+    "Количество запросов к эндпоинту.",
+    ("view", "method", "status"),
+)
+LATENCY = Histogram(
+    "foodgram_http_request_duration_seconds",
+    "Время обработки запроса.",
+    ("view",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SQL_QUERIES = Histogram(
+    "foodgram_sql_queries_per_request",
+    "Количество SQL-запросов на один запрос к эндпоинту.",
+    ("view",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+SQL_DURATION = Histogram(
+    "foodgram_sql_duration_seconds",
+    "Суммарное время SQL-запросов на один запрос к эндпоинту.",
+    ("view",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_http_response_size_bytes",
+    "Размер тела ответа.",
+    ("view",),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+AUTH_TOKEN_CACHE = Counter(
+    "foodgram_auth_token_cache",
+    "Проверки токена: local и shared — попадания в кэш процесса "
+    "и общий кэш, miss — запрос к БД.",
+    ("result",),
+)
+
+
+def view_name(view_func, method):
+    """Имя вьюсета и действия, например RecipesViewSet.list."""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+def render_metrics():
+    """Метрики в текстовом формате Prometheus, со всех воркеров."""
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class SQLRecorder:
+    """
+    Обертка execute_wrapper, считающая запросы и их время
+    по всем базам из DATABASES, включая реплику.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+    @contextmanager
+    def record(self):
+        """Контекст, в котором считаются запросы ко всем базам."""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield
+
+
+class MetricsMiddleware:
+    """
+    Метрики по эндпоинтам: количество запросов, задержка,
+    SQL-запросы и их время, размер ответа.
+    Для потоковых ответов замер завершается после отдачи последней части.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_view = UNRESOLVED_VIEW
+        recorder = SQLRecorder()
+        started = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        if isinstance(response, StreamingHttpResponse):
+            response.streaming_content = self.stream(
+                request,
+                response,
+                response.streaming_content,
+                recorder,
+                started,
+            )
+        else:
+            self.observe(
+                request, response, recorder, started, len(response.content)
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func, request.method)
+
+    def stream(self, request, response, content, recorder, started):
+        size = 0
+        try:
+            with recorder.record():
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.observe(request, response, recorder, started, size)
+
+    @staticmethod
+    def observe(request, response, recorder, started, size):
+        view = request.metrics_view
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        LATENCY.labels(view).observe(time.perf_counter() - started)
+        SQL_QUERIES.labels(view).observe(recorder.count)
+        SQL_DURATION.labels(view).observe(recorder.duration)
+        RESPONSE_SIZE.labels(view).observe(size)
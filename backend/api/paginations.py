@@ -1,4 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from recipes.models import FeedEntries
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+REVERSE_MARK = "r"
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -7,3 +17,178 @@ class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 20
+
+
+class LimitCursorPagination(CursorPagination):
+    """
+    Пагинация по курсору без COUNT(*) и OFFSET. Курсор хранит значения
+    полей ordering крайней строки страницы, следующая страница
+    выбирается условием по ним (keyset) и читается по индексу.
+    Включается параметром ?pagination=cursor.
+    """
+
+    page_size = 6
+    page_size_query_param = "limit"
+    max_page_size = 20
+    ordering = ("-id",)
+
+    def decode_position(self, request, model):
+        """Значения полей ordering из курсора и признак обратного хода."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            values = (
+                urlsafe_b64decode(encoded.encode("ascii"))
+                .decode("ascii")
+                .split("|")
+            )
+            reverse = values[0] == REVERSE_MARK
+            if reverse:
+                values = values[1:]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = tuple(
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, values)
+            )
+        except (
+            binascii.Error,
+            DjangoValidationError,
+            UnicodeError,
+            ValueError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_position(self, position, reverse=False):
+        """Ссылка на страницу после (или до, reverse) строки position."""
+        values = [
+            value.isoformat() if hasattr(value, "isoformat") else str(value)
+            for value in position
+        ]
+        if reverse:
+            values.insert(0, REVERSE_MARK)
+        encoded = urlsafe_b64encode("|".join(values).encode("ascii"))
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded.decode("ascii")
+        )
+
+    def after(self, position, reverse=False):
+        """Условие на строки после position в порядке ordering."""
+        condition, equal = Q(), {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def row_position(self, row):
+        return tuple(
+            row.serializable_value(field.lstrip("-"))
+            for field in self.ordering
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_position(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        if reverse:
+            page.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        self.next_position = self.previous_position = None
+        if page and has_next:
+            self.next_position = self.row_position(page[-1])
+        if page and has_previous:
+            self.previous_position = self.row_position(page[0])
+        return page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_position(self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_position(self.previous_position, reverse=True)
+
+
+class FeedPagination(LimitCursorPagination):
+    """
+    Курсор ленты подписок: дата публикации и id последнего рецепта
+    страницы. Записи страницы выбирает FeedEntries.objects.page.
+    """
+
+    ordering = ("-pud_date", "-recipe")
+
+    def get_position(self, request):
+        position, reverse = self.decode_position(request, FeedEntries)
+        if reverse:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def paginate_entries(self, entries, request):
+        """
+        Первые page_size записей из entries, выбранных с запасом в одну
+        запись, чтобы узнать о следующей странице.
+        """
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        self.next_position = (
+            entries[page_size - 1] if len(entries) > page_size else None
+        )
+        self.previous_position = None
+        return entries[:page_size]
+
+
+class CursorPaginationMixin:
+    """
+    Выбор пагинации по курсору по параметру запроса. Курсор задает
+    свой порядок cursor_ordering, поэтому параметры из
+    cursor_conflicting_params, меняющие порядок, с ним несовместимы.
+    """
+
+    cursor_query_param = "pagination"
+    cursor_ordering = ("-id",)
+    cursor_conflicting_params = ()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            mode = self.request.query_params.get(self.cursor_query_param)
+            if mode == "cursor":
+                conflicting = [
+                    param
+                    for param in self.cursor_conflicting_params
+                    if param in self.request.query_params
+                ]
+                if conflicting:
+                    raise ValidationError(
+                        {
+                            param: "Не поддерживается с pagination=cursor."
+                            for param in conflicting
+                        }
+                    )
+                self._paginator = LimitCursorPagination()
+                self._paginator.ordering = self.cursor_ordering
+            else:
+                self._paginator = super().paginator
+        return self._paginator
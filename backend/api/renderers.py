@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.http import Http404
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+TITLE_SHOP_LIST = "Список покупок с сайта Foodgram:"
+CSV_HEADER = ("Ингредиент", "Количество", "Единица измерения")
+PDF_FONT_NAME = "ShoppingListFont"
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+
+
+class ExportContentNegotiation(BaseContentNegotiation):
+    """Выбор формата выгрузки только по параметру ?format=."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        export_format = (
+            format_suffix
+            or request.query_params.get(api_settings.URL_FORMAT_OVERRIDE)
+            or renderers[0].format
+        )
+        for renderer in renderers:
+            if renderer.format == export_format:
+                return renderer, renderer.media_type
+        raise Http404
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    """
+    Базовый класс выгрузки списка покупок.
+    Сам документ отдается потоком через stream(), render() используется
+    только для ответов с ошибками.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f"{self.media_type}; charset={self.charset}"
+        return self.media_type
+
+    def prepare(self):
+        """
+        Проверки до отправки заголовков: ошибка здесь дает ответ 500,
+        а не оборванный файл.
+        """
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """Части документа для StreamingHttpResponse."""
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    """Список покупок в текстовом файле."""
+
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, ingredients):
+        yield f"{TITLE_SHOP_LIST}\n\n"
+        separator = ""
+        for ingredient in ingredients:
+            yield (
+                f'{separator}{ingredient["ingredient__name"]} - '
+                f'{ingredient["total"]}/'
+                f'{ingredient["ingredient__measurement_unit"]}'
+            )
+            separator = "\n"
+
+
+class EchoBuffer:
+    """Буфер, возвращающий записанную строку, для потокового csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """Список покупок в CSV."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, ingredients):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(CSV_HEADER)
+        for ingredient in ingredients:
+            yield writer.writerow(
+                (
+                    ingredient["ingredient__name"],
+                    ingredient["total"],
+                    ingredient["ingredient__measurement_unit"],
+                )
+            )
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    Список покупок в PDF.
+    reportlab собирает документ целиком при save(), поэтому строки
+    читаются из курсора по мере рисования, а готовый файл отдается
+    одной частью.
+    """
+
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+
+    def prepare(self):
+        """Шрифт SHOPPING_LIST_PDF_FONT с кириллицей."""
+        if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+            )
+
+    def stream(self, ingredients):
+        buffer = io.BytesIO()
+        canvas = Canvas(buffer, pagesize=A4)
+        _, height = A4
+        canvas.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+        canvas.drawString(PDF_MARGIN, height - PDF_MARGIN, TITLE_SHOP_LIST)
+        position = height - PDF_MARGIN - 2 * PDF_LINE_HEIGHT
+        for ingredient in ingredients:
+            if position < PDF_MARGIN:
+                canvas.showPage()
+                canvas.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                position = height - PDF_MARGIN
+            canvas.drawString(
+                PDF_MARGIN,
+                position,
+                f'{ingredient["ingredient__name"]} - {ingredient["total"]}/'
+                f'{ingredient["ingredient__measurement_unit"]}',
+            )
+            position -= PDF_LINE_HEIGHT
+        canvas.save()
+        yield buffer.getvalue()
@@ -0,0 +1,68 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "russian"
+# Колонка и таблица FTS5 создаются миграцией recipes 0010 вне модели.
+SEARCH_VECTOR_COLUMN = "search_vector"
+FTS_TABLE_SUFFIX = "_fts"
+SEARCH_MAX_TERMS = 10
+TERM_PATTERN = re.compile(r"[^\W_]+")
+
+
+def search_terms(query):
+    """Слова запроса в нижнем регистре, без знаков препинания."""
+    return TERM_PATTERN.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+
+def search_recipes(queryset, query):
+    """
+    Рецепты, в названии или описании которых есть все слова запроса
+    (по префиксу), от более релевантных к менее.
+    PostgreSQL ищет по tsvector с GIN-индексом, SQLite по таблице FTS5,
+    остальные базы по icontains.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    opts = queryset.model._meta
+    table = quote_name(opts.db_table)
+    if connection.vendor == "postgresql":
+        tsquery = (SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+        vector = f"{table}.{quote_name(SEARCH_VECTOR_COLUMN)}"
+        queryset = queryset.annotate(
+            search_match=RawSQL(
+                f"{vector} @@ to_tsquery(%s, %s)",
+                tsquery,
+                output_field=BooleanField(),
+            ),
+            search_rank=RawSQL(
+                f"ts_rank_cd({vector}, to_tsquery(%s, %s))",
+                tsquery,
+                output_field=FloatField(),
+            ),
+        ).filter(search_match=True)
+    elif connection.vendor == "sqlite":
+        fts = quote_name(f"{opts.db_table}{FTS_TABLE_SUFFIX}")
+        queryset = queryset.annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({fts}, 10.0, 1.0) FROM {fts} "
+                f"WHERE {fts} MATCH %s "
+                f"AND {fts}.rowid = {table}.{quote_name(opts.pk.column)}",
+                (" ".join(f'"{term}"*' for term in terms),),
+                output_field=FloatField(),
+            )
+        ).filter(search_rank__isnull=False)
+    else:
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(text__icontains=term)
+            )
+        queryset = queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.order_by("-search_rank", "-pud_date", "-id")
@@ -1,5 +1,7 @@
+from collections import Counter
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_base64.fields import Base64ImageField
 from recipes.models import (
@@ -8,13 +10,15 @@ from recipes.models import (
     IngredientsInRecipe,
     Recipes,
     ShoppingLists,
+    ShoppingListTotals,
     Tags,
 )
 from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueValidator
 from users.models import Follow
 
+from .images import schedule_variants
+
 User = get_user_model()
 
 
@@ -25,6 +29,12 @@ class GetIsSubscribedMixin:
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        subscribed = getattr(obj, "is_subscribed", None)
+        if subscribed is not None:
+            return subscribed
+        subscriptions = self.context.get("subscriptions")
+        if subscriptions is not None:
+            return obj.id in subscriptions
         return user.follower.filter(author=obj.id).exists()
 
 
@@ -32,13 +42,23 @@ class GetIngredientsMixin:
     """Миксин для рецептов."""
 
     def get_ingredients(self, obj):
-        """Получение ингредиентов."""
-        return obj.ingredients.values(
-            "id",
-            "name",
-            "measurement_unit",
-            amount=F("ingredients_amount__amount"),
-        )
+        """Получение ингредиентов из предзагруженных ingredients_amount."""
+        ingredients = obj.ingredients_amount.all()
+        if "ingredients_amount" not in getattr(
+            obj, "_prefetched_objects_cache", {}
+        ):
+            ingredients = ingredients.select_related("ingredient").order_by(
+                "ingredient__name"
+            )
+        return [
+            {
+                "id": item.ingredient.id,
+                "name": item.ingredient.name,
+                "measurement_unit": item.ingredient.measurement_unit,
+                "amount": item.amount,
+            }
+            for item in ingredients
+        ]
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -107,10 +127,36 @@ class RecipesReadSerializer(GetIngredientsMixin, serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.BooleanField(default=False)
     is_in_shopping_cart = serializers.BooleanField(default=False)
+    ingredients_have = serializers.IntegerField(read_only=True)
+    ingredients_missing = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Recipes
-        fields = "__all__"
+        fields = (
+            "id",
+            "tags",
+            "author",
+            "ingredients",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "ingredients_have",
+            "ingredients_missing",
+            "image",
+            "image_thumbnail",
+            "image_card",
+            "image_full",
+            "name",
+            "text",
+            "cooking_time",
+            "pud_date",
+        )
+
+    def to_representation(self, instance):
+        """Подписка на автора из аннотации is_subscribed queryset."""
+        subscribed = getattr(instance, "is_subscribed", None)
+        if subscribed is not None:
+            instance.author.is_subscribed = subscribed
+        return super().to_representation(instance)
 
 
 class RecipesWriteSerializer(GetIngredientsMixin, serializers.ModelSerializer):
@@ -124,26 +170,67 @@ class RecipesWriteSerializer(GetIngredientsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Recipes
-        fields = "__all__"
-        read_only_fields = ("author",)
+        fields = (
+            "id",
+            "tags",
+            "ingredients",
+            "image",
+            "image_thumbnail",
+            "image_card",
+            "image_full",
+            "name",
+            "text",
+            "cooking_time",
+            "pud_date",
+            "author",
+        )
+        read_only_fields = (
+            "author",
+            "image_thumbnail",
+            "image_card",
+            "image_full",
+        )
 
     def validate(self, data):
         """Валидация ингредиентов при заполнении рецепта."""
-        ingredients = self.initial_data["ingredients"]
-        ingredient_list = []
+        if self.partial and "ingredients" not in self.initial_data:
+            return data
+        ingredients = self.initial_data.get("ingredients")
         if not ingredients:
             raise serializers.ValidationError(
                 "Минимально должен быть 1 ингредиент."
             )
-        for item in ingredients:
-            ingredient = get_object_or_404(Ingredients, id=item["id"])
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    "Ингредиент не должен повторяться."
-                )
-            if int(item.get("amount")) < 1:
-                raise serializers.ValidationError("Минимальное количество = 1")
-            ingredient_list.append(ingredient)
+        try:
+            ingredients = [
+                {"id": int(item["id"]), "amount": int(item["amount"])}
+                for item in ingredients
+            ]
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError(
+                "Для каждого ингредиента нужны id и количество."
+            )
+        counts = Counter(item["id"] for item in ingredients)
+        unknown = counts.keys() - set(
+            Ingredients.objects.filter(id__in=counts).values_list(
+                "id", flat=True
+            )
+        )
+        duplicates = [pk for pk, count in counts.items() if count > 1]
+        errors = []
+        if unknown:
+            errors.append(
+                "Ингредиенты не найдены: "
+                f"{', '.join(map(str, sorted(unknown)))}."
+            )
+        if duplicates:
+            errors.append(
+                "Ингредиенты не должны повторяться: "
+                f"{', '.join(map(str, sorted(duplicates)))}."
+            )
+        if any(item["amount"] < 1 for item in ingredients):
+            errors.append("Минимальное количество = 1")
+        if errors:
+            raise serializers.ValidationError(errors)
         data["ingredients"] = ingredients
         return data
 
@@ -156,10 +243,7 @@ class RecipesWriteSerializer(GetIngredientsMixin, serializers.ModelSerializer):
     def add_ingredients_and_tags(self, instance, **validate_data):
         """Добавление ингредиентов тегов."""
         ingredients = validate_data["ingredients"]
-        tags = validate_data["tags"]
-        for tag in tags:
-            instance.tags.add(tag)
-
+        instance.tags.set(validate_data["tags"])
         IngredientsInRecipe.objects.bulk_create(
             [
                 IngredientsInRecipe(
@@ -176,18 +260,58 @@ class RecipesWriteSerializer(GetIngredientsMixin, serializers.ModelSerializer):
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
         recipe = super().create(validated_data)
+        schedule_variants(recipe)
         return self.add_ingredients_and_tags(
             recipe, ingredients=ingredients, tags=tags
         )
 
+    @staticmethod
+    def update_ingredients(instance, ingredients):
+        """
+        Изменение ингредиентов рецепта по разнице с текущими строками.
+        Возвращает id ингредиентов, количество которых изменилось.
+        """
+        existing = {
+            row.ingredient_id: row for row in instance.ingredients_amount.all()
+        }
+        amounts = {item["id"]: item["amount"] for item in ingredients}
+        removed = existing.keys() - amounts.keys()
+        added = amounts.keys() - existing.keys()
+        changed = [
+            row
+            for pk, row in existing.items()
+            if pk in amounts and row.amount != amounts[pk]
+        ]
+        for row in changed:
+            row.amount = amounts[row.ingredient_id]
+        if removed:
+            IngredientsInRecipe.objects.filter(
+                recipe=instance, ingredient__in=removed
+            ).delete()
+        if changed:
+            IngredientsInRecipe.objects.bulk_update(changed, ("amount",))
+        if added:
+            IngredientsInRecipe.objects.bulk_create(
+                IngredientsInRecipe(
+                    recipe=instance, ingredient_id=pk, amount=amounts[pk]
+                )
+                for pk in added
+            )
+        return removed | added | {row.ingredient_id for row in changed}
+
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        instance.tags.clear()
-        ingredients = validated_data.pop("ingredients")
-        tags = validated_data.pop("tags")
-        instance = self.add_ingredients_and_tags(
-            instance, ingredients=ingredients, tags=tags
-        )
+        ingredients = validated_data.pop("ingredients", None)
+        tags = validated_data.pop("tags", None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            affected = self.update_ingredients(instance, ingredients)
+            if affected:
+                ShoppingListTotals.objects.refresh(
+                    instance.list.values("user"), affected
+                )
+        if "image" in validated_data:
+            schedule_variants(instance)
         return super().update(instance, validated_data)
 
 
@@ -203,6 +327,19 @@ class RecipeAddingSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "name", "image", "cooking_time")
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPES_BULK_LIMIT,
+    )
+
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
+
+
 class FollowSerializer(GetIsSubscribedMixin, serializers.ModelSerializer):
     """Сериализация объектов типа Follow. Подписки."""
 
@@ -228,17 +365,24 @@ class FollowSerializer(GetIsSubscribedMixin, serializers.ModelSerializer):
             "recipes_count",
         )
 
+    def get_is_subscribed(self, obj):
+        return super().get_is_subscribed(obj.author)
+
     def get_recipes(self, obj):
         """Получение рецептов автора."""
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        queryset = obj.author.recipes.all()
-        if limit:
-            queryset = queryset[: int(limit)]
+        authors_recipes = self.context.get("recipes")
+        if authors_recipes is not None:
+            queryset = authors_recipes.get(obj.author_id, [])
+        else:
+            queryset = obj.author.recipes.all()
+            limit = self.context.get("recipes_limit")
+            if limit is not None:
+                queryset = queryset[:limit]
         return RecipeAddingSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.all().count()
+        counters = getattr(obj.author, "counters", None)
+        return counters.recipes_count if counters else 0
 
 
 class CheckFollowSerializer(serializers.ModelSerializer):
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Ingredients, IngredientsInRecipe, Recipes, Tags
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import bump_recipes_generation
+from .indexes import ingredients_index, recipe_ingredients_index
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def invalidate_ingredients_index(**kwargs):
+    """Сброс индекса ингредиентов при изменении справочника."""
+    ingredients_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Recipes)
+@receiver((post_save, post_delete), sender=IngredientsInRecipe)
+@receiver((post_save, post_delete), sender=Tags)
+@receiver(m2m_changed, sender=Recipes.tags.through)
+@receiver(m2m_changed, sender=Recipes.ingredients.through)
+def invalidate_recipes_cache(**kwargs):
+    """
+    Сброс кэша списков рецептов при любой записи. Поколение меняется
+    после фиксации транзакции, чтобы не закэшировать старые данные.
+    """
+    transaction.on_commit(bump_recipes_generation)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Токен удален, например через token/logout."""
+    transaction.on_commit(lambda: token_cache.invalidate([instance.key]))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, created, update_fields=None, **kwargs):
+    """
+    Смена пароля, активности или профиля: закэшированный пользователь
+    устарел. Обновление last_login при входе кэш не сбрасывает.
+    QuerySet.update сигналов не отправляет, после него нужен
+    token_cache.invalidate_users.
+    """
+    if created or update_fields == frozenset(("last_login",)):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: token_cache.invalidate_users([user_id]))
+
+
+@receiver(post_delete, sender=Recipes)
+def discard_deleted_recipe(instance, **kwargs):
+    """Удаленный рецепт больше не подбирается по ингредиентам."""
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: recipe_ingredients_index.discard(recipe_id))
@@ -0,0 +1,370 @@
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from recipes.models import IngredientsInRecipe, Recipes
+
+from .cache import get_recipes_generation
+
+ARRAYS = (
+    "recipe_ids",
+    "ingredient_ids",
+    "tag_ids",
+    "idf",
+    "indptr",
+    "indices",
+    "data",
+    "col_indptr",
+    "col_rows",
+    "col_data",
+)
+CURRENT_LINK = "current"
+META_FILE = "meta.json"
+SYNC_BATCH_SIZE = 500
+# Рецепты, измененные незадолго до сборки или прошлой синхронизации,
+# перечитываются: их транзакция могла еще не завершиться.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class MatrixNotBuiltError(Exception):
+    """Матрица похожих рецептов не собрана командой build_similar_index."""
+
+
+def read_pairs(queryset):
+    """Пары (рецепт, признак) из values_list без списков кортежей."""
+    pairs = np.fromiter(
+        (value for pair in queryset.iterator() for value in pair),
+        dtype=np.int64,
+    )
+    return pairs[0::2], pairs[1::2]
+
+
+def build_matrix(ingredient_pairs, tag_pairs):
+    """
+    Нормированные TF-IDF векторы рецептов по ингредиентам и тегам
+    в виде строк (CSR) и столбцов (CSC) разреженной матрицы.
+    Пары передаются как два массива: id рецептов и id признаков.
+    """
+    ingredient_ids = np.unique(ingredient_pairs[1])
+    tag_ids = np.unique(tag_pairs[1])
+    recipe_ids = np.unique(
+        np.concatenate((ingredient_pairs[0], tag_pairs[0]))
+    )
+    columns = len(ingredient_ids) + len(tag_ids)
+    rows = np.searchsorted(
+        recipe_ids, np.concatenate((ingredient_pairs[0], tag_pairs[0]))
+    )
+    cols = np.concatenate(
+        (
+            np.searchsorted(ingredient_ids, ingredient_pairs[1]),
+            len(ingredient_ids) + np.searchsorted(tag_ids, tag_pairs[1]),
+        )
+    )
+    keys = np.unique(rows.astype(np.int64) * max(columns, 1) + cols)
+    rows = (keys // max(columns, 1)).astype(np.int32)
+    cols = (keys % max(columns, 1)).astype(np.int32)
+    frequency = np.bincount(cols, minlength=columns)
+    idf = (
+        np.log(len(recipe_ids) / np.maximum(frequency, 1)) + 1
+    ).astype(np.float32)
+    data = idf[cols]
+    norms = np.sqrt(
+        np.bincount(rows, weights=data.astype(np.float64) ** 2)
+    ).astype(np.float32)
+    data /= norms[rows]
+    order = np.argsort(cols, kind="stable")
+    return {
+        "recipe_ids": recipe_ids,
+        "ingredient_ids": ingredient_ids,
+        "tag_ids": tag_ids,
+        "idf": idf,
+        "indptr": np.concatenate(
+            ([0], np.cumsum(np.bincount(rows, minlength=len(recipe_ids))))
+        ),
+        "indices": cols,
+        "data": data,
+        "col_indptr": np.concatenate(
+            ([0], np.cumsum(np.bincount(cols, minlength=columns)))
+        ),
+        "col_rows": rows[order],
+        "col_data": data[order],
+    }
+
+
+def build_from_database():
+    """Матрица по всем рецептам и время начала чтения данных."""
+    started = timezone.now()
+    matrix = build_matrix(
+        read_pairs(
+            IngredientsInRecipe.objects.values_list(
+                "recipe_id", "ingredient_id"
+            ).order_by()
+        ),
+        read_pairs(
+            Recipes.tags.through.objects.values_list(
+                "recipes_id", "tags_id"
+            ).order_by()
+        ),
+    )
+    return matrix, started
+
+
+def save_matrix(arrays, directory, built_at):
+    """
+    Записать матрицу в новый каталог и атомарно переключить на него
+    ссылку current. Старые сборки, кроме предыдущей, удаляются.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"build-{built_at:%Y%m%d%H%M%S%f}"
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    for key in ARRAYS:
+        np.save(os.path.join(path, f"{key}.npy"), arrays[key])
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "built_at": built_at.isoformat(),
+                "recipes": len(arrays["recipe_ids"]),
+            },
+            file,
+        )
+    link = os.path.join(directory, CURRENT_LINK)
+    previous = os.readlink(link) if os.path.islink(link) else None
+    temporary = f"{link}.{os.getpid()}"
+    os.symlink(name, temporary)
+    os.replace(temporary, link)
+    for old in os.listdir(directory):
+        if old.startswith("build-") and old not in (name, previous):
+            for file_name in os.listdir(os.path.join(directory, old)):
+                os.remove(os.path.join(directory, old, file_name))
+            os.rmdir(os.path.join(directory, old))
+    return path
+
+
+def load_matrix(path):
+    """Массивы сборки, отображенные в память без чтения в процесс."""
+    arrays = {
+        key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+        for key in ARRAYS
+    }
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as file:
+        built_at = parse_datetime(json.load(file)["built_at"])
+    return arrays, built_at
+
+
+class SimilarityMatrix:
+    """Косинусная близость рецептов по матрице нормированных векторов."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(self.arrays["recipe_ids"])
+
+    def row(self, recipe_id):
+        """Номер строки рецепта или None."""
+        recipe_ids = self.arrays["recipe_ids"]
+        row = int(np.searchsorted(recipe_ids, recipe_id))
+        if row < len(recipe_ids) and recipe_ids[row] == recipe_id:
+            return row
+        return None
+
+    def column(self, kind, feature_id):
+        """Номер столбца ингредиента ("ingredient") или тега ("tag")."""
+        keys = self.arrays[f"{kind}_ids"]
+        column = int(np.searchsorted(keys, feature_id))
+        if column < len(keys) and keys[column] == feature_id:
+            if kind == "tag":
+                return len(self.arrays["ingredient_ids"]) + column
+            return column
+        return None
+
+    def idf(self, column):
+        if column is None:
+            return float(np.log(max(len(self), 1)) + 1)
+        return float(self.arrays["idf"][column])
+
+    def vector(self, row):
+        """Вектор строки: {столбец: вес}."""
+        start, end = self.arrays["indptr"][row:row + 2]
+        return dict(
+            zip(
+                self.arrays["indices"][start:end].tolist(),
+                self.arrays["data"][start:end].tolist(),
+            )
+        )
+
+    def scores(self, vector):
+        """
+        Близость вектора ко всем строкам. Плотный массив накапливается
+        bincount быстрее, чем группировка кандидатов через unique.
+        """
+        col_indptr = self.arrays["col_indptr"]
+        rows, weights = [], []
+        for column, weight in vector.items():
+            if not isinstance(column, int):
+                continue
+            start, end = col_indptr[column:column + 2]
+            rows.append(self.arrays["col_rows"][start:end])
+            weights.append(self.arrays["col_data"][start:end] * weight)
+        if not rows:
+            return np.zeros(len(self))
+        return np.bincount(
+            np.concatenate(rows),
+            weights=np.concatenate(weights),
+            minlength=len(self),
+        )
+
+    def top(self, vector, limit, exclude=()):
+        """До limit пар (id рецепта, близость) по убыванию близости."""
+        scores = self.scores(vector)
+        # Пустой кортеж как индекс numpy выбирает весь массив.
+        if len(exclude):
+            scores[exclude] = 0
+        rows = np.arange(len(scores))
+        if len(scores) > limit:
+            rows = np.argpartition(-scores, limit)[:limit]
+        recipe_ids = self.arrays["recipe_ids"][rows]
+        return [
+            (recipe_id, score)
+            for recipe_id, score in zip(
+                recipe_ids.tolist(), scores[rows].tolist()
+            )
+            if score > 0
+        ]
+
+
+class RecipeSimilarityIndex:
+    """
+    Похожие рецепты по матрице, собранной командой build_similar_index
+    и отображенной в память всеми воркерами. Рецепты, созданные или
+    измененные после сборки, читаются из БД при смене поколения или
+    раз в RECIPES_INDEX_SYNC_INTERVAL и хранятся в процессе поверх
+    матрицы. Новая сборка подхватывается при следующем запросе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._path = None
+        self._matrix = None
+        self._overlay = {}
+        self._stale_rows = np.empty(0, np.int32)
+        self._generation = None
+        self._synced_at = None
+        self._checked_at = None
+
+    def _load(self):
+        """Переключиться на последнюю сборку матрицы, если она сменилась."""
+        link = os.path.join(settings.SIMILAR_INDEX_DIR, CURRENT_LINK)
+        path = os.path.realpath(link) if os.path.islink(link) else None
+        if self._loaded and path == self._path:
+            return
+        if path is None:
+            raise MatrixNotBuiltError
+        arrays, built_at = load_matrix(path)
+        self._matrix = SimilarityMatrix(arrays)
+        self._synced_at = built_at - SYNC_OVERLAP
+        self._loaded, self._path = True, path
+        self._overlay = {}
+        self._stale_rows = np.empty(0, np.int32)
+        self._generation = self._checked_at = None
+
+    def _vectors(self, recipe_ids):
+        """Нормированные векторы рецептов по данным из БД."""
+        features = {}
+        ingredients = IngredientsInRecipe.objects.values_list(
+            "recipe_id", "ingredient_id"
+        ).order_by()
+        tags = Recipes.tags.through.objects.values_list(
+            "recipes_id", "tags_id"
+        ).order_by()
+        recipe_ids, size = list(recipe_ids), SYNC_BATCH_SIZE
+        for start in range(0, len(recipe_ids), size):
+            batch = recipe_ids[start:start + size]
+            for kind, rows in (
+                ("ingredient", ingredients.filter(recipe__in=batch)),
+                ("tag", tags.filter(recipes__in=batch)),
+            ):
+                for recipe_id, feature_id in rows:
+                    column = self._matrix.column(kind, feature_id)
+                    features.setdefault(recipe_id, {})[
+                        (kind, feature_id) if column is None else column
+                    ] = self._matrix.idf(column)
+        vectors = {}
+        for recipe_id, vector in features.items():
+            norm = sum(weight ** 2 for weight in vector.values()) ** 0.5
+            vectors[recipe_id] = {
+                key: weight / norm for key, weight in vector.items()
+            }
+        return vectors
+
+    def sync(self):
+        """Перечитать рецепты, измененные с прошлой синхронизации."""
+        started = timezone.now()
+        changed = list(
+            Recipes.objects.filter(
+                modified__gte=self._synced_at
+            ).values_list("id", flat=True)
+        )
+        vectors = self._vectors(changed)
+        for recipe_id in changed:
+            self._overlay[recipe_id] = vectors.get(recipe_id, {})
+        self._stale_rows = np.array(
+            [
+                row
+                for row in map(self._matrix.row, self._overlay)
+                if row is not None
+            ],
+            dtype=np.int32,
+        )
+        self._synced_at = started - SYNC_OVERLAP
+
+    def _ensure_synced(self):
+        self._load()
+        now = time.monotonic()
+        generation = get_recipes_generation()
+        if (
+            generation != self._generation
+            or self._checked_at is None
+            or now - self._checked_at > settings.RECIPES_INDEX_SYNC_INTERVAL
+        ):
+            self.sync()
+            self._generation, self._checked_at = generation, now
+
+    def similar(self, recipe_id, limit):
+        """
+        До limit пар (id рецепта, близость) по убыванию близости
+        или None, если рецепта нет ни в матрице, ни среди новых.
+        Удаленные после сборки рецепты могут попасть в результат.
+        MatrixNotBuiltError, если матрица еще не собрана.
+        """
+        with self._lock:
+            self._ensure_synced()
+            if recipe_id in self._overlay:
+                vector = self._overlay[recipe_id]
+            else:
+                row = self._matrix.row(recipe_id)
+                if row is None:
+                    return None
+                vector = self._matrix.vector(row)
+            result = self._matrix.top(vector, limit + 1, self._stale_rows)
+            for other_id, other in self._overlay.items():
+                score = sum(
+                    weight * other.get(key, 0)
+                    for key, weight in vector.items()
+                )
+                if score > 0:
+                    result.append((other_id, score))
+        result = [pair for pair in result if pair[0] != recipe_id]
+        result.sort(key=lambda pair: (-pair[1], -pair[0]))
+        return result[:limit]
+
+
+similar_recipes_index = RecipeSimilarityIndex()
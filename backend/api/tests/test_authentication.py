@@ -0,0 +1,88 @@
+from core.cache import cache_is_shared
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache, token_cache_key
+
+User = get_user_model()
+
+URL = "/api/users/me/"
+
+
+class CachedTokenAuthenticationTest(TransactionTestCase):
+    """
+    Сброс кэша токенов. Сигналы сбрасывают его после коммита,
+    поэтому тесты идут без общей транзакции.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        self.client = APIClient()
+        response = self.client.post(
+            "/api/auth/token/login/",
+            {"email": "reader@example.com", "password": "pass"},
+        )
+        self.key = response.data["auth_token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.key}")
+
+    def me(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(URL)
+        reads_token = any(
+            "authtoken_token" in query["sql"]
+            for query in context.captured_queries
+        )
+        return response.status_code, reads_token
+
+    def test_token_is_cached(self):
+        self.assertEqual(self.me(), (200, True))
+        self.assertEqual(self.me(), (200, False))
+
+    def test_shared_tier_only_with_shared_cache(self):
+        self.me()
+        self.assertEqual(
+            cache.get(token_cache_key(self.key)) is not None,
+            cache_is_shared(),
+        )
+
+    def test_logout(self):
+        self.me()
+        response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.key))
+        self.assertEqual(self.me(), (401, True))
+
+    def test_password_change(self):
+        self.me()
+        response = self.client.post(
+            "/api/users/set_password/",
+            {"current_password": "pass", "new_password": "NewPass!2024"},
+        )
+        self.assertEqual(response.status_code, 204, response.data)
+        self.assertIsNone(token_cache.get(self.key))
+        self.assertEqual(self.me(), (200, True))
+
+    def test_last_login_keeps_cache(self):
+        self.me()
+        self.user.save(update_fields=["last_login"])
+        self.assertEqual(self.me(), (200, False))
+
+    def test_deactivation(self):
+        self.me()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me(), (401, True))
+
+    def test_queryset_update_needs_invalidate_users(self):
+        self.me()
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.me(), (200, False))
+        token_cache.invalidate_users([self.user.id])
+        self.assertEqual(self.me(), (401, True))
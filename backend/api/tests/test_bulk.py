@@ -0,0 +1,176 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from recipes.models import (
+    FavouriteRecipes,
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    ShoppingLists,
+    ShoppingListTotals,
+)
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class BulkLinksApiTest(APITestCase):
+    """Массовое добавление и удаление в избранное и список покупок."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        flour = Ingredients.objects.create(name="Мука", measurement_unit="г")
+        self.recipes = [
+            Recipes.objects.create(
+                name=f"Рецепт {number}",
+                author=self.user,
+                text="Описание",
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            for number in range(3)
+        ]
+        for number, recipe in enumerate(self.recipes, 1):
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=flour, amount=number * 100
+            )
+        self.missing = max(recipe.id for recipe in self.recipes) + 1
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url, ids):
+        response = getattr(self.client, method)(
+            url, {"recipes": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return [item["status"] for item in response.data["results"]]
+
+    def favorites_counts(self):
+        return [
+            Recipes.objects.get(id=recipe.id).favorites_count
+            for recipe in self.recipes
+        ]
+
+    def check_favorites(self):
+        url = "/api/recipes/favorite/bulk/"
+        first, second, third = (recipe.id for recipe in self.recipes)
+        self.client.post(f"/api/recipes/{first}/favorite/")
+        self.assertEqual(
+            self.request("post", url, [first, second, self.missing]),
+            ["exists", "created", "not_found"],
+        )
+        self.assertEqual(self.favorites_counts(), [1, 1, 0])
+        self.assertEqual(
+            self.request("delete", url, [second, third, self.missing]),
+            ["deleted", "not_found", "not_found"],
+        )
+        self.assertEqual(self.favorites_counts(), [1, 0, 0])
+        self.assertEqual(
+            list(
+                FavouriteRecipes.objects.filter(user=self.user).values_list(
+                    "recipe", flat=True
+                )
+            ),
+            [first],
+        )
+
+    def check_shopping_cart(self):
+        url = "/api/recipes/shopping_cart/bulk/"
+        first, second, third = (recipe.id for recipe in self.recipes)
+        self.assertEqual(
+            self.request("post", url, [first, third, first]),
+            ["created", "created"],
+        )
+        self.assertEqual(
+            self.request("post", url, [first, second]), ["exists", "created"]
+        )
+        self.assertEqual(self.total(), 600)
+        self.assertEqual(
+            self.request("delete", url, [third, third, second]),
+            ["deleted", "deleted"],
+        )
+        self.assertEqual(self.total(), 100)
+        self.assertEqual(
+            list(
+                ShoppingLists.objects.filter(user=self.user).values_list(
+                    "recipe", flat=True
+                )
+            ),
+            [first],
+        )
+
+    def total(self):
+        return ShoppingListTotals.objects.get(user=self.user).total
+
+    def test_favorites(self):
+        self.check_favorites()
+
+    def test_shopping_cart(self):
+        self.check_shopping_cart()
+
+    @mock.patch("core.managers.can_return_rows", return_value=False)
+    def test_favorites_without_returning(self, _):
+        self.check_favorites()
+
+    @mock.patch("core.managers.can_return_rows", return_value=False)
+    def test_shopping_cart_without_returning(self, _):
+        self.check_shopping_cart()
+
+
+class BulkLinksRaceTest(APITestCase):
+    """
+    Связи, которые другой запрос добавил или удалил перед записью,
+    не попадают в результат и не меняют счетчики второй раз.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f"reader{number}",
+                email=f"reader{number}@example.com",
+                password="pass",
+            )
+            for number in range(2)
+        ]
+        self.recipe = Recipes.objects.create(
+            name="Пирог",
+            author=self.users[0],
+            text="Описание",
+            cooking_time=10,
+            image="image_recipes/recipe.png",
+        )
+        self.manager = FavouriteRecipes.objects
+
+    def favorites_count(self):
+        return Recipes.objects.get(id=self.recipe.id).favorites_count
+
+    def test_link_many_skips_concurrent_insert(self):
+        statement = self.manager._insert_statement
+
+        def concurrent(user, targets):
+            FavouriteRecipes.objects.create(user=user, recipe=self.recipe)
+            return statement(user, targets)
+
+        with mock.patch.object(
+            self.manager, "_insert_statement", side_effect=concurrent
+        ):
+            result = self.manager.link_many(self.users[0], [self.recipe.id])
+        self.assertEqual(result, {self.recipe.id: False})
+        self.assertEqual(self.favorites_count(), 1)
+
+    def test_unlink_many_skips_concurrent_delete(self):
+        for user in self.users:
+            self.manager.link(user, self.recipe)
+        statement = self.manager._delete_statement
+
+        def concurrent(user, targets):
+            FavouriteRecipes.objects.filter(user=user).delete()
+            return statement(user, targets)
+
+        with mock.patch.object(
+            self.manager, "_delete_statement", side_effect=concurrent
+        ):
+            result = self.manager.unlink_many(self.users[0], [self.recipe.id])
+        self.assertEqual(result, set())
+        self.assertEqual(self.favorites_count(), 1)
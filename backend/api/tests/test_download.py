@@ -0,0 +1,104 @@
+import csv
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from recipes.models import (
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    ShoppingLists,
+)
+from reportlab.pdfbase.ttfonts import TTFError
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+class DownloadShoppingCartTest(APITestCase):
+    """Выгрузка списка покупок в разных форматах."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="pass"
+        )
+        flour = Ingredients.objects.create(name="Мука", measurement_unit="г")
+        milk = Ingredients.objects.create(name="Молоко", measurement_unit="мл")
+        for amount in (100, 250):
+            recipe = Recipes.objects.create(
+                name=f"Рецепт {amount}",
+                author=self.user,
+                text="Описание",
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=flour, amount=amount
+            )
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=milk, amount=amount * 2
+            )
+            ShoppingLists.objects.link(self.user, recipe)
+        self.client.force_authenticate(self.user)
+
+    def download(self, export_format=None):
+        params = {"format": export_format} if export_format else {}
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_txt(self):
+        for export_format in (None, "txt"):
+            response, content = self.download(export_format)
+            self.assertEqual(
+                response["Content-Type"], "text/plain; charset=utf-8"
+            )
+            self.assertEqual(
+                response["Content-Disposition"],
+                "attachment; filename=shopping-list.txt",
+            )
+            self.assertEqual(
+                content.decode(),
+                "Список покупок с сайта Foodgram:\n\n"
+                "Молоко - 700/мл\nМука - 350/г",
+            )
+
+    def test_csv(self):
+        response, content = self.download("csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content.decode()))),
+            [
+                ["Ингредиент", "Количество", "Единица измерения"],
+                ["Молоко", "700", "мл"],
+                ["Мука", "350", "г"],
+            ],
+        )
+
+    def test_pdf(self):
+        response, content = self.download("pdf")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(content.startswith(b"%PDF"))
+
+    def test_empty_list(self):
+        ShoppingLists.objects.unlink_many(
+            self.user, self.user.list.values_list("recipe", flat=True)
+        )
+        _, content = self.download("csv")
+        self.assertEqual(
+            content.decode().splitlines(),
+            ["Ингредиент,Количество,Единица измерения"],
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(URL, {"format": "docx"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_broken_font_fails_before_streaming(self):
+        with mock.patch(
+            "api.renderers.pdfmetrics.getRegisteredFontNames", return_value=[]
+        ), mock.patch("api.renderers.TTFont", side_effect=TTFError):
+            with self.assertRaises(TTFError):
+                self.client.get(URL, {"format": "pdf"})
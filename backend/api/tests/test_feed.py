@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from recipes.models import FeedEntries, Recipes
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+URL = "/api/recipes/feed/"
+
+
+class FeedTest(APITestCase):
+    """Лента рецептов авторов из подписок."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        self.author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        self.other = User.objects.create_user(
+            username="other", email="other@example.com", password="pass"
+        )
+        self.old = [self.create_recipe(self.author) for _ in range(3)]
+        self.create_recipe(self.other)
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, author):
+        return Recipes.objects.create(
+            name="Пирог",
+            author=author,
+            text="Описание",
+            cooking_time=10,
+            image="image_recipes/recipe.png",
+        )
+
+    def subscribe(self, author):
+        response = self.client.post(f"/api/users/{author.id}/subscribe/")
+        self.assertEqual(response.status_code, 201)
+
+    def unsubscribe(self, author):
+        response = self.client.delete(f"/api/users/{author.id}/subscribe/")
+        self.assertEqual(response.status_code, 204)
+
+    def feed(self, params=None):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def feed_ids(self):
+        return [item["id"] for item in self.feed()["results"]]
+
+    def stored_ids(self):
+        return set(
+            FeedEntries.objects.filter(user=self.user).values_list(
+                "recipe", flat=True
+            )
+        )
+
+    def test_empty_without_subscriptions(self):
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(URL).status_code, 401)
+
+    def test_backfill_on_follow(self):
+        self.subscribe(self.author)
+        expected = [recipe.id for recipe in reversed(self.old)]
+        self.assertEqual(self.feed_ids(), expected)
+        self.assertEqual(self.stored_ids(), set(expected))
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_backfill_limit(self):
+        self.subscribe(self.author)
+        self.assertEqual(
+            self.feed_ids(), [recipe.id for recipe in self.old[:0:-1]]
+        )
+
+    def test_new_recipe_fans_out(self):
+        self.subscribe(self.author)
+        recipe = self.create_recipe(self.author)
+        self.create_recipe(self.other)
+        self.assertEqual(self.feed_ids()[0], recipe.id)
+        self.assertIn(recipe.id, self.stored_ids())
+        self.assertEqual(len(self.feed_ids()), len(self.old) + 1)
+
+    def test_unfollow_prunes(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        self.unsubscribe(self.author)
+        self.assertEqual(
+            self.feed_ids(),
+            list(
+                Recipes.objects.filter(author=self.other).values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+        self.assertFalse(
+            FeedEntries.objects.filter(
+                user=self.user, author=self.author
+            ).exists()
+        )
+
+    def test_deleted_recipe_leaves_feed(self):
+        self.subscribe(self.author)
+        self.old[-1].delete()
+        self.assertNotIn(self.old[-1].id, self.feed_ids())
+        self.assertNotIn(self.old[-1].id, self.stored_ids())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_is_merged_on_read(self):
+        self.subscribe(self.author)
+        recipe = self.create_recipe(self.author)
+        self.assertEqual(self.stored_ids(), set())
+        self.assertEqual(
+            self.feed_ids(),
+            [recipe.id] + [recipe.id for recipe in reversed(self.old)],
+        )
+        self.unsubscribe(self.author)
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_pages(self):
+        self.subscribe(self.author)
+        for _ in range(3):
+            self.create_recipe(self.author)
+        data = self.feed({"limit": 4})
+        ids = [item["id"] for item in data["results"]]
+        self.assertEqual(len(ids), 4)
+        data = self.client.get(data["next"]).data
+        ids += [item["id"] for item in data["results"]]
+        self.assertIsNone(data["next"])
+        self.assertEqual(
+            ids,
+            list(
+                Recipes.objects.filter(author=self.author)
+                .order_by("-pud_date", "-id")
+                .values_list("id", flat=True)
+            ),
+        )
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from recipes.models import (
+    FavouriteRecipes,
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    ShoppingLists,
+    ShoppingListTotals,
+)
+from rest_framework.test import APITestCase
+from users.models import Follow, UserCounters
+
+User = get_user_model()
+
+
+class LinksApiTest(APITestCase):
+    """Повторное добавление и удаление связей отвечает 400."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        self.author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        self.recipe = Recipes.objects.create(
+            name="Пирог",
+            author=self.author,
+            text="Описание",
+            cooking_time=10,
+            image="image_recipes/recipe.png",
+        )
+        IngredientsInRecipe.objects.create(
+            recipe=self.recipe,
+            ingredient=Ingredients.objects.create(
+                name="Мука", measurement_unit="г"
+            ),
+            amount=100,
+        )
+        self.client.force_authenticate(self.user)
+
+    def assert_toggles(self, url, links, counter):
+        for status in (201, 400):
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(links.count(), 1)
+            self.assertEqual(counter(), 1)
+        for status in (204, 400):
+            response = self.client.delete(url)
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(links.count(), 0)
+            self.assertEqual(counter(), 0)
+
+    def test_favorite(self):
+        self.assert_toggles(
+            f"/api/recipes/{self.recipe.id}/favorite/",
+            FavouriteRecipes.objects.filter(user=self.user),
+            lambda: Recipes.objects.get(id=self.recipe.id).favorites_count,
+        )
+
+    def test_shopping_cart(self):
+        self.assert_toggles(
+            f"/api/recipes/{self.recipe.id}/shopping_cart/",
+            ShoppingLists.objects.filter(user=self.user),
+            lambda: ShoppingListTotals.objects.filter(user=self.user).count(),
+        )
+
+    def test_subscribe(self):
+        self.assert_toggles(
+            f"/api/users/{self.author.id}/subscribe/",
+            Follow.objects.filter(user=self.user),
+            lambda: UserCounters.objects.get(
+                user=self.author
+            ).followers_count,
+        )
+
+    def test_subscribe_to_self(self):
+        response = self.client.post(f"/api/users/{self.user.id}/subscribe/")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,133 @@
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from recipes.models import Recipes
+from rest_framework.test import APITestCase
+from users.models import Follow
+
+User = get_user_model()
+
+
+class CursorPaginationTest(APITestCase):
+    """Пагинация списка рецептов по курсору (pud_date, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        now = timezone.now()
+        for number in range(7):
+            recipe = Recipes.objects.create(
+                name=f"Рецепт {number}",
+                author=cls.user,
+                text="Описание",
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            # Рецепты попарно публикуются в одну и ту же секунду.
+            Recipes.objects.filter(id=recipe.id).update(
+                pud_date=now - timedelta(seconds=number // 2)
+            )
+        cls.expected = list(
+            Recipes.objects.order_by("-pud_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_round_trip_over_ties(self):
+        data = self.get("/api/recipes/", {"pagination": "cursor", "limit": 2})
+        self.assertIsNone(data["previous"])
+        pages = [[item["id"] for item in data["results"]]]
+        while data["next"]:
+            data = self.get(data["next"])
+            pages.append([item["id"] for item in data["results"]])
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        backward = []
+        while data["previous"]:
+            data = self.get(data["previous"])
+            backward.append([item["id"] for item in data["results"]])
+        self.assertEqual(backward, pages[-2::-1])
+        self.assertIsNotNone(data["next"])
+
+    def test_next_after_previous(self):
+        data = self.get("/api/recipes/", {"pagination": "cursor", "limit": 3})
+        second = self.get(data["next"])
+        first = self.get(second["previous"])
+        self.assertEqual(first["results"], data["results"])
+        self.assertEqual(self.get(first["next"])["results"], second["results"])
+
+    def test_malformed_cursor(self):
+        for cursor in (
+            "not base64!",
+            urlsafe_b64encode(b"1").decode(),
+            urlsafe_b64encode(b"yesterday|1").decode(),
+            urlsafe_b64encode("2024-01-01T00:00:00|один".encode()).decode(),
+            urlsafe_b64encode(b"r|2024-01-01T00:00:00|1|2").decode(),
+        ):
+            response = self.client.get(
+                "/api/recipes/", {"pagination": "cursor", "cursor": cursor}
+            )
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_conflicting_params(self):
+        for param, value in (
+            ("ordering", "popular"),
+            ("search", "рецепт"),
+            ("ingredients", "1"),
+        ):
+            response = self.client.get(
+                "/api/recipes/", {"pagination": "cursor", param: value}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(response.data), [param])
+
+    def test_search_with_page_numbers(self):
+        response = self.client.get("/api/recipes/", {"search": "рецепт"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 7)
+
+
+class SubscriptionsCursorPaginationTest(APITestCase):
+    """Пагинация подписок по курсору (id)."""
+
+    def test_round_trip(self):
+        user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        for number in range(5):
+            Follow.objects.link(
+                user,
+                User.objects.create_user(
+                    username=f"cook{number}",
+                    email=f"cook{number}@example.com",
+                    password="pass",
+                ),
+            )
+        self.client.force_authenticate(user)
+        url = "/api/users/subscriptions/"
+        data = self.client.get(url, {"pagination": "cursor", "limit": 2}).data
+        ids = [item["id"] for item in data["results"]]
+        while data["next"]:
+            data = self.client.get(data["next"]).data
+            ids += [item["id"] for item in data["results"]]
+        self.assertEqual(
+            ids,
+            list(
+                Follow.objects.filter(user=user)
+                .order_by("id")
+                .values_list("author", flat=True)
+            ),
+        )
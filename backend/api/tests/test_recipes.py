@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredients, IngredientsInRecipe, Recipes, Tags
+from rest_framework.test import APITestCase
+from users.models import Follow
+
+User = get_user_model()
+
+
+class RecipesListQueriesTest(APITestCase):
+    """Страница рецептов загружается фиксированным числом запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        authors = [
+            User.objects.create_user(
+                username=f"author{number}",
+                email=f"author{number}@example.com",
+                password="pass",
+            )
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=authors[0])
+        tags = [
+            Tags.objects.create(
+                name=f"Тег {number}",
+                color=f"#00000{number}",
+                slug=f"tag{number}",
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredients.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(4)
+        ]
+        for number in range(12):
+            recipe = Recipes.objects.create(
+                name=f"Рецепт {number}",
+                author=authors[number % len(authors)],
+                text="Описание",
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            IngredientsInRecipe.objects.bulk_create(
+                IngredientsInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in ingredients[:number % 4 + 1]
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/recipes/", {"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), limit)
+        return len(context.captured_queries), response.data["results"]
+
+    def test_queries_do_not_depend_on_page_size(self):
+        small, _ = self.count_queries(2)
+        large, _ = self.count_queries(12)
+        self.assertEqual(small, large)
+
+    def test_page_queries(self):
+        # Значения фильтров author и tags, количество, основной запрос,
+        # теги и ингредиенты.
+        with self.assertNumQueries(6):
+            self.client.get("/api/recipes/", {"limit": 12})
+
+    def test_prefetched_data(self):
+        _, results = self.count_queries(12)
+        for item in results:
+            recipe = Recipes.objects.get(id=item["id"])
+            self.assertEqual(
+                item["author"]["is_subscribed"],
+                Follow.objects.filter(
+                    user=self.user, author=recipe.author
+                ).exists(),
+            )
+            self.assertEqual(
+                [tag["id"] for tag in item["tags"]],
+                list(recipe.tags.values_list("id", flat=True)),
+            )
+            self.assertEqual(
+                [ingredient["name"] for ingredient in item["ingredients"]],
+                list(
+                    recipe.ingredients_amount.order_by(
+                        "ingredient__name"
+                    ).values_list("ingredient__name", flat=True)
+                ),
+            )
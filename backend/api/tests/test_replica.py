@@ -0,0 +1,113 @@
+from unittest import skipUnless
+
+from core.routers import ReplicaMiddleware, replica_configured
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipes
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@skipUnless(
+    replica_configured(),
+    "Нужна реплика: DB_REPLICA_NAME и общий кэш в CACHE_BACKEND.",
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Чтение из реплики и запись в основную БД. В тестах реплика
+    зеркалит основную БД, поэтому маршрут виден по соединению,
+    выполнившему запросы.
+    """
+
+    databases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        self.recipe = Recipes.objects.create(
+            name="Пирог",
+            author=self.user,
+            text="Описание",
+            cooking_time=10,
+            image="image_recipes/recipe.png",
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user)}"
+        )
+
+    def request(self, method, url):
+        with CaptureQueriesContext(
+            connections[DEFAULT_DB_ALIAS]
+        ) as primary, CaptureQueriesContext(
+            connections[settings.REPLICA_DATABASE]
+        ) as replica:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400, response.content)
+        return primary.captured_queries, replica.captured_queries
+
+    @staticmethod
+    def recipe_reads(queries):
+        return [
+            query
+            for query in queries
+            if 'FROM "recipes_recipes"' in query["sql"]
+        ]
+
+    def test_get_reads_from_replica(self):
+        primary, replica = self.request("get", "/api/recipes/")
+        self.assertTrue(self.recipe_reads(replica))
+        self.assertFalse(self.recipe_reads(primary))
+
+    def test_token_is_read_from_primary(self):
+        primary, replica = self.request("get", "/api/recipes/")
+        self.assertTrue(
+            any("authtoken_token" in query["sql"] for query in primary)
+        )
+        self.assertFalse(
+            any("authtoken_token" in query["sql"] for query in replica)
+        )
+
+    def test_write_goes_to_primary_and_sticks(self):
+        primary, replica = self.request(
+            "post", f"/api/recipes/{self.recipe.id}/favorite/"
+        )
+        self.assertTrue(
+            any(query["sql"].startswith("INSERT") for query in primary)
+        )
+        self.assertFalse(replica)
+        primary, replica = self.request("get", "/api/recipes/")
+        self.assertTrue(self.recipe_reads(primary))
+        self.assertFalse(replica)
+
+    def test_sticky_window_expires(self):
+        self.request("post", f"/api/recipes/{self.recipe.id}/favorite/")
+        cache.clear()
+        _, replica = self.request("get", "/api/recipes/")
+        self.assertTrue(self.recipe_reads(replica))
+
+    def test_other_clients_keep_reading_from_replica(self):
+        self.request("post", f"/api/recipes/{self.recipe.id}/favorite/")
+        self.client.credentials()
+        _, replica = self.request("get", "/api/recipes/")
+        self.assertTrue(self.recipe_reads(replica))
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_requires_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaMiddleware(lambda request: None)
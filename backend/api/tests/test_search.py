@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import Recipes
+from rest_framework.test import APITestCase
+
+from api.search import search_recipes
+
+User = get_user_model()
+
+
+class RecipesSearchApiTest(APITestCase):
+    """Поиск по рецептам, созданным после всех миграций."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        # Кэш списков для анонимов сбрасывается после коммита, а тест
+        # идет в одной транзакции.
+        self.client.force_authenticate(self.author)
+
+    def create_recipe(self, name, text):
+        return Recipes.objects.create(
+            name=name,
+            author=self.author,
+            text=text,
+            cooking_time=10,
+            image="image_recipes/recipe.png",
+        )
+
+    def search(self, query):
+        response = self.client.get("/api/recipes/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_new_recipe_is_found(self):
+        recipe = self.create_recipe("Пирог", "Яблочный пирог")
+        self.create_recipe("Суп", "Овощной суп")
+        self.assertEqual(self.search("пирог"), [recipe.id])
+
+    def test_updated_recipe_is_found(self):
+        recipe = self.create_recipe("Суп", "Овощной суп")
+        recipe.name = "Пирог"
+        recipe.save()
+        self.assertEqual(self.search("пирог"), [recipe.id])
+        self.assertEqual(self.search("суп"), [recipe.id])
+        recipe.text = "Без начинки"
+        recipe.save()
+        self.assertEqual(self.search("суп"), [])
+
+    def test_deleted_recipe_is_not_found(self):
+        recipe = self.create_recipe("Пирог", "Яблочный пирог")
+        recipe.delete()
+        self.assertEqual(self.search("пирог"), [])
+
+
+class SearchRecipesTest(TestCase):
+    """Полнотекстовый поиск по названию и описанию."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="pass"
+        )
+        cls.recipes = {
+            key: Recipes.objects.create(
+                name=name,
+                author=author,
+                text=text,
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            for key, name, text in (
+                ("pie", "Яблочный пирог", "Тесто и яблоки"),
+                ("cake", "Торт", "Бисквит с яблочным джемом"),
+                ("soup", "Суп", "Овощной суп с картофелем"),
+                ("pies", "Пирожки", "Пирожки с картофелем"),
+            )
+        }
+
+    def search(self, query):
+        ids = {recipe.id: key for key, recipe in self.recipes.items()}
+        return [
+            ids[recipe.id]
+            for recipe in search_recipes(Recipes.objects.all(), query)
+        ]
+
+    def test_name_match(self):
+        self.assertEqual(self.search("торт"), ["cake"])
+
+    def test_text_match(self):
+        self.assertEqual(self.search("бисквит"), ["cake"])
+
+    def test_prefix_match(self):
+        self.assertEqual(set(self.search("пирож")), {"pies"})
+        self.assertEqual(set(self.search("пиро")), {"pie", "pies"})
+
+    def test_all_terms_required(self):
+        self.assertEqual(self.search("суп картоф"), ["soup"])
+        self.assertEqual(self.search("суп торт"), [])
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(self.search("яблочн"), ["pie", "cake"])
+
+    def test_punctuation_is_ignored(self):
+        self.assertEqual(self.search('"торт"*:'), ["cake"])
+
+    def test_empty_query_keeps_queryset(self):
+        self.assertEqual(len(self.search("  ,.")), len(self.recipes))
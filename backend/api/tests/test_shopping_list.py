@@ -0,0 +1,157 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from recipes.models import (
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    ShoppingLists,
+    ShoppingListTotals,
+)
+
+User = get_user_model()
+
+
+class ShoppingListTotalsTest(TestCase):
+    """Суммы списка покупок после удаления рецепта через ORM."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="pass"
+        )
+        self.ingredient = Ingredients.objects.create(
+            name="Мука", measurement_unit="г"
+        )
+        self.recipes = [
+            Recipes.objects.create(
+                name=f"Рецепт {amount}",
+                author=self.user,
+                text="Описание",
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            for amount in (100, 250)
+        ]
+        for amount, recipe in zip((100, 250), self.recipes):
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=self.ingredient, amount=amount
+            )
+            ShoppingLists.objects.create(user=self.user, recipe=recipe)
+        ShoppingListTotals.objects.refresh([self.user.id], [self.ingredient])
+
+    def totals(self):
+        return list(
+            ShoppingListTotals.objects.filter(user=self.user).values_list(
+                "ingredient", "total"
+            )
+        )
+
+    def test_refresh_is_idempotent(self):
+        ShoppingListTotals.objects.refresh([self.user.id], [self.ingredient])
+        self.assertEqual(self.totals(), [(self.ingredient.id, 350)])
+
+    def test_delete_recipe(self):
+        self.recipes[0].delete()
+        self.assertEqual(self.totals(), [(self.ingredient.id, 250)])
+
+    def test_delete_queryset(self):
+        Recipes.objects.filter(id__in=[r.id for r in self.recipes]).delete()
+        self.assertEqual(self.totals(), [])
+
+
+class ShoppingListTotalsAdminTest(TestCase):
+    """Суммы списка покупок после изменений в админке."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        self.request = RequestFactory().post("/admin/")
+        self.request.user = self.user
+        self.flour, self.milk = (
+            Ingredients.objects.create(name=name, measurement_unit="г")
+            for name in ("Мука", "Молоко")
+        )
+        self.recipes = [
+            Recipes.objects.create(
+                name=f"Рецепт {amount}",
+                author=self.user,
+                text="Описание",
+                cooking_time=10,
+                image="image_recipes/recipe.png",
+            )
+            for amount in (100, 250)
+        ]
+        self.rows = [
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=self.flour, amount=amount
+            )
+            for amount, recipe in zip((100, 250), self.recipes)
+        ]
+        ShoppingLists.objects.link(self.user, self.recipes[0])
+
+    def admin(self, model):
+        return admin.site._registry[model]
+
+    def totals(self):
+        return list(
+            ShoppingListTotals.objects.filter(user=self.user)
+            .order_by("ingredient_id")
+            .values_list("ingredient", "total")
+        )
+
+    def test_add_cart_row(self):
+        self.admin(ShoppingLists).save_model(
+            self.request,
+            ShoppingLists(user=self.user, recipe=self.recipes[1]),
+            None,
+            False,
+        )
+        self.assertEqual(self.totals(), [(self.flour.id, 350)])
+
+    def test_change_cart_row(self):
+        row = ShoppingLists.objects.get(user=self.user)
+        row.recipe = self.recipes[1]
+        self.admin(ShoppingLists).save_model(self.request, row, None, True)
+        self.assertEqual(self.totals(), [(self.flour.id, 250)])
+
+    def test_delete_cart_rows(self):
+        self.admin(ShoppingLists).delete_model(
+            self.request, ShoppingLists.objects.get(user=self.user)
+        )
+        self.assertEqual(self.totals(), [])
+        ShoppingLists.objects.link_many(self.user, self.recipes)
+        self.admin(ShoppingLists).delete_queryset(
+            self.request, ShoppingLists.objects.filter(user=self.user)
+        )
+        self.assertEqual(self.totals(), [])
+
+    def test_change_recipe_ingredient(self):
+        row = self.rows[0]
+        row.amount = 150
+        self.admin(IngredientsInRecipe).save_model(
+            self.request, row, None, True
+        )
+        self.assertEqual(self.totals(), [(self.flour.id, 150)])
+        row.ingredient = self.milk
+        self.admin(IngredientsInRecipe).save_model(
+            self.request, row, None, True
+        )
+        self.assertEqual(self.totals(), [(self.milk.id, 150)])
+
+    def test_add_and_delete_recipe_ingredient(self):
+        row = IngredientsInRecipe(
+            recipe=self.recipes[0], ingredient=self.milk, amount=30
+        )
+        self.admin(IngredientsInRecipe).save_model(
+            self.request, row, None, False
+        )
+        self.assertEqual(
+            self.totals(), [(self.flour.id, 100), (self.milk.id, 30)]
+        )
+        self.admin(IngredientsInRecipe).delete_model(self.request, row)
+        self.assertEqual(self.totals(), [(self.flour.id, 100)])
+        self.admin(IngredientsInRecipe).delete_queryset(
+            self.request, IngredientsInRecipe.objects.all()
+        )
+        self.assertEqual(self.totals(), [])
@@ -0,0 +1,28 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.similar import SimilarityMatrix, build_matrix
+
+
+class SimilarityMatrixTopTest(SimpleTestCase):
+    """Ближайшие рецепты по матрице."""
+
+    def setUp(self):
+        # Рецепты 1 и 2 делят ингредиент 10, у рецепта 3 он свой.
+        self.matrix = SimilarityMatrix(
+            build_matrix(
+                (np.array([1, 1, 2, 3]), np.array([10, 11, 10, 12])),
+                (np.array([1, 2]), np.array([1, 1])),
+            )
+        )
+        self.vector = self.matrix.vector(self.matrix.row(1))
+
+    def test_top_without_exclude(self):
+        result = sorted(self.matrix.top(self.vector, 3), key=lambda x: -x[1])
+        self.assertEqual([recipe_id for recipe_id, _ in result], [1, 2])
+
+    def test_top_with_exclude(self):
+        result = self.matrix.top(
+            self.vector, 3, np.array([self.matrix.row(1)])
+        )
+        self.assertEqual([recipe_id for recipe_id, _ in result], [2])
@@ -6,6 +6,7 @@ from .views import (
     IngredientsViewSet,
     RecipesViewSet,
     TagsViewSet,
+    metrics,
 )
 
 app_name = "api"
@@ -17,6 +18,7 @@ router_v1.register("tags", TagsViewSet)
 router_v1.register("ingredients", IngredientsViewSet)
 
 urlpatterns = [
+    path("metrics/", metrics, name="metrics"),
     path("", include(router_v1.urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
@@ -1,27 +1,68 @@
+from collections import defaultdict
 from http import HTTPStatus
+from itertools import chain
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import BooleanField, Exists, OuterRef, Sum, Value
-from django.http import HttpResponse
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window,
+)
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from recipes.models import (
     FavouriteRecipes,
+    FeedEntries,
     Ingredients,
     IngredientsInRecipe,
     Recipes,
     ShoppingLists,
+    ShoppingListTotals,
     Tags,
 )
 from rest_framework import mixins, viewsets
-from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import (
+    APIException,
+    NotFound,
+    ValidationError,
+)
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
 from users.models import Follow
 
+from .cache import recipes_list_cache_key
+from .conditional import (
+    conditional_get,
+    ingredients_index_stamp,
+    ingredients_stamp,
+    recipe_stamp,
+    tags_stamp,
+)
 from .filters import IngredientsSearchFilter, RecipesFilter
+from .indexes import ingredients_index
+from .metrics import render_metrics
+from .paginations import CursorPaginationMixin, FeedPagination
 from .permissions import IsAdminAuthorOrReadOnly, IsAdminOrReadOnly
+from .renderers import (
+    ExportContentNegotiation,
+    ShoppingListCSVRenderer,
+    ShoppingListPDFRenderer,
+    ShoppingListTextRenderer,
+)
 from .serializers import (
     CheckFavouriteSerializer,
     CheckFollowSerializer,
@@ -30,14 +71,15 @@ from .serializers import (
     IngredientsSerializer,
     RecipeAddingSerializer,
     RecipesReadSerializer,
+    RecipeIdsSerializer,
     RecipesWriteSerializer,
     TagsSerializer,
 )
+from .similar import MatrixNotBuiltError, similar_recipes_index
 
 User = get_user_model()
 
-FILE_NAME = "shopping-list.txt"
-TITLE_SHOP_LIST = "Список покупок с сайта Foodgram:\n\n"
+FILE_NAME = "shopping-list"
 
 
 class ListRetrieveViewSet(
@@ -46,6 +88,22 @@ class ListRetrieveViewSet(
     permission_classes = (IsAdminOrReadOnly,)
 
 
+class SimilarUnavailable(APIException):
+    status_code = HTTPStatus.SERVICE_UNAVAILABLE
+    default_detail = "Похожие рецепты временно недоступны."
+    default_code = "similar_unavailable"
+
+
+def raise_unchanged(check_serializer, request, data):
+    """
+    Запись ничего не изменила: ошибка 400 от прежней проверки,
+    которая теперь выполняется только в этом случае.
+    """
+    serializer = check_serializer(data=data, context={"request": request})
+    serializer.is_valid(raise_exception=True)
+    raise ValidationError("Данные изменились во время запроса, повторите его.")
+
+
 class TagsViewSet(ListRetrieveViewSet):
     """Класс взаимодействия с моделью Tags. Вьюсет для списка тегов."""
 
@@ -53,6 +111,14 @@ class TagsViewSet(ListRetrieveViewSet):
     serializer_class = TagsSerializer
     pagination_class = None
 
+    @conditional_get(tags_stamp)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(tags_stamp)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class IngredientsViewSet(ListRetrieveViewSet):
     """Класс взаимодействия с моделью Ingredients. Вьюсет для ингредиентов."""
@@ -62,12 +128,25 @@ class IngredientsViewSet(ListRetrieveViewSet):
     pagination_class = None
     filter_class = IngredientsSearchFilter
 
+    @conditional_get(ingredients_index_stamp)
+    def list(self, request, *args, **kwargs):
+        """Поиск ингредиентов по индексу в памяти, без обращения к БД."""
+        return Response(
+            ingredients_index.search(request.query_params.get("name"))
+        )
+
+    @conditional_get(ingredients_stamp)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     """Класс взаимодействия с моделью Recipes. Вьюсет для рецептов."""
 
     permission_classes = (IsAdminAuthorOrReadOnly,)
     filter_class = RecipesFilter
+    cursor_ordering = ("-pud_date", "-id")
+    cursor_conflicting_params = ("ordering", "search", "ingredients")
 
     def get_serializer_class(self):
         """Сериализаторы для рецептов."""
@@ -77,8 +156,17 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Резюме по объектам с помощью annotate()."""
+        queryset = Recipes.objects.select_related("author").prefetch_related(
+            Prefetch("tags", queryset=Tags.objects.all()),
+            Prefetch(
+                "ingredients_amount",
+                queryset=IngredientsInRecipe.objects.select_related(
+                    "ingredient"
+                ).order_by("ingredient__name"),
+            ),
+        )
         if self.request.user.is_authenticated:
-            return Recipes.objects.annotate(
+            return queryset.annotate(
                 is_favorited=Exists(
                     FavouriteRecipes.objects.filter(
                         user=self.request.user, recipe__pk=OuterRef("pk")
@@ -89,114 +177,319 @@ class RecipesViewSet(viewsets.ModelViewSet):
                         user=self.request.user, recipe__pk=OuterRef("pk")
                     )
                 ),
+                is_subscribed=Exists(
+                    Follow.objects.filter(
+                        user=self.request.user, author=OuterRef("author")
+                    )
+                ),
             )
         else:
-            return Recipes.objects.annotate(
+            return queryset.annotate(
                 is_favorited=Value(False, output_field=BooleanField()),
                 is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField()),
             )
 
+    def list(self, request, *args, **kwargs):
+        """Списки рецептов для анонимов отдаются из общего кэша."""
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        key = recipes_list_cache_key(request)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == HTTPStatus.OK:
+            cache.set(key, response.data, settings.RECIPES_CACHE_TIMEOUT)
+        return response
+
+    @conditional_get(recipe_stamp, vary=("Authorization",))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @transaction.atomic()
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic()
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Лента рецептов авторов из подписок, по курсору ?cursor=."""
+        paginator = FeedPagination()
+        entries = FeedEntries.objects.page(
+            request.user,
+            paginator.get_page_size(request) + 1,
+            paginator.get_position(request),
+        )
+        ids = [pk for _, pk in paginator.paginate_entries(entries, request)]
+        recipes = (
+            self.get_queryset().filter(id__in=ids).order_by("-pud_date", "-id")
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """
+        Похожие рецепты по ингредиентам и тегам, ?limit= до
+        SIMILAR_RECIPES_MAX_LIMIT. Ближайшие берутся из матрицы в памяти,
+        из БД читаются только найденные рецепты.
+        """
+        limit = request.query_params.get("limit")
+        try:
+            limit = int(limit) if limit else settings.SIMILAR_RECIPES_LIMIT
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= settings.SIMILAR_RECIPES_MAX_LIMIT:
+            raise ValidationError(
+                {
+                    "limit": "Должно быть целое число от 1 до "
+                    f"{settings.SIMILAR_RECIPES_MAX_LIMIT}."
+                }
+            )
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise NotFound
+        if not Recipes.objects.filter(pk=pk).exists():
+            raise NotFound
+        # С запасом на рецепты, удаленные после сборки матрицы.
+        try:
+            similar = similar_recipes_index.similar(pk, limit * 2) or []
+        except MatrixNotBuiltError:
+            raise SimilarUnavailable
+        ids = [recipe_id for recipe_id, _ in similar]
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in ids if recipe_id in recipes][
+                :limit
+            ],
+            many=True,
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True, methods=["POST"], permission_classes=(IsAuthenticated,)
     )
     def favorite(self, request, pk=None):
         """Добавить в избранное."""
-        data = {
-            "user": request.user.id,
-            "recipe": pk,
-        }
-        serializer = CheckFavouriteSerializer(
-            data=data, context={"request": request}
+        return self.add_object(
+            FavouriteRecipes, CheckFavouriteSerializer, request, pk
         )
-        serializer.is_valid(raise_exception=True)
-        return self.add_object(FavouriteRecipes, request.user, pk)
 
     @favorite.mapping.delete
     def del_favorite(self, request, pk=None):
         """Убрать из избранного."""
-        data = {
-            "user": request.user.id,
-            "recipe": pk,
-        }
-        serializer = CheckFavouriteSerializer(
-            data=data, context={"request": request}
+        return self.delete_object(
+            FavouriteRecipes, CheckFavouriteSerializer, request, pk
         )
-        serializer.is_valid(raise_exception=True)
-        return self.delete_object(FavouriteRecipes, request.user, pk)
 
     @action(
         detail=True, methods=["POST"], permission_classes=(IsAuthenticated,)
     )
     def shopping_cart(self, request, pk=None):
         """Добавить в лист покупок."""
-        data = {
-            "user": request.user.id,
-            "recipe": pk,
-        }
-        serializer = CheckShoppingCartSerializer(
-            data=data, context={"request": request}
+        return self.add_object(
+            ShoppingLists, CheckShoppingCartSerializer, request, pk
         )
-        serializer.is_valid(raise_exception=True)
-        return self.add_object(ShoppingLists, request.user, pk)
 
     @shopping_cart.mapping.delete
     def del_shopping_cart(self, request, pk=None):
         """Убрать из листа покупок."""
-        data = {
-            "user": request.user.id,
-            "recipe": pk,
-        }
-        serializer = CheckShoppingCartSerializer(
-            data=data, context={"request": request}
+        return self.delete_object(
+            ShoppingLists, CheckShoppingCartSerializer, request, pk
         )
-        serializer.is_valid(raise_exception=True)
-        return self.delete_object(ShoppingLists, request.user, pk)
 
     @transaction.atomic()
-    def add_object(self, model, user, pk):
+    def add_object(self, model, check_serializer, request, pk):
         """Добавление объектов для избранного/спсика покупок."""
-        recipe = get_object_or_404(Recipes, id=pk)
-        model.objects.create(user=user, recipe=recipe)
+        user = request.user
+        if not model.objects.link(user, pk):
+            raise_unchanged(
+                check_serializer, request, {"user": user.id, "recipe": pk}
+            )
+        recipe = Recipes.objects.only(
+            "id", "name", "image", "cooking_time"
+        ).get(id=pk)
         serializer = RecipeAddingSerializer(recipe)
         return Response(serializer.data, status=HTTPStatus.CREATED)
 
     @transaction.atomic()
-    def delete_object(self, model, user, pk):
+    def delete_object(self, model, check_serializer, request, pk):
         """Удаление объектов для избранного/спсика покупок."""
-        model.objects.filter(user=user, recipe__id=pk).delete()
+        user = request.user
+        if not model.objects.unlink(user, pk):
+            raise_unchanged(
+                check_serializer, request, {"user": user.id, "recipe": pk}
+            )
         return Response(status=HTTPStatus.NO_CONTENT)
 
     @action(
-        methods=["GET"], detail=False, permission_classes=(IsAuthenticated,)
+        detail=False,
+        methods=["POST"],
+        url_path="favorite/bulk",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        """Добавить в избранное несколько рецептов."""
+        return self.add_objects(FavouriteRecipes, request)
+
+    @favorite_bulk.mapping.delete
+    def del_favorite_bulk(self, request):
+        """Убрать из избранного несколько рецептов."""
+        return self.delete_objects(FavouriteRecipes, request)
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="shopping_cart/bulk",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавить в лист покупок несколько рецептов."""
+        return self.add_objects(ShoppingLists, request)
+
+    @shopping_cart_bulk.mapping.delete
+    def del_shopping_cart_bulk(self, request):
+        """Убрать из листа покупок несколько рецептов."""
+        return self.delete_objects(ShoppingLists, request)
+
+    @staticmethod
+    def get_recipe_ids(request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["recipes"]
+
+    @transaction.atomic()
+    def add_objects(self, model, request):
+        """Массовое добавление в избранное/список покупок."""
+        ids = self.get_recipe_ids(request)
+        statuses = {
+            pk: "created" if created else "exists"
+            for pk, created in model.objects.link_many(
+                request.user, ids
+            ).items()
+        }
+        return Response(
+            {
+                "results": [
+                    {"id": pk, "status": statuses.get(pk, "not_found")}
+                    for pk in ids
+                ]
+            }
+        )
+
+    @transaction.atomic()
+    def delete_objects(self, model, request):
+        """Массовое удаление из избранного/списка покупок."""
+        ids = self.get_recipe_ids(request)
+        deleted = model.objects.unlink_many(request.user, ids)
+        return Response(
+            {
+                "results": [
+                    {
+                        "id": pk,
+                        "status": "deleted" if pk in deleted else "not_found",
+                    }
+                    for pk in ids
+                ]
+            }
+        )
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListPDFRenderer,
+        ),
+        content_negotiation_class=ExportContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        """Скачать файл листа покупок."""
-        ingredients = (
-            IngredientsInRecipe.objects.filter(recipe__list__user=request.user)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .order_by("ingredient__name")
-            .annotate(total=Sum("amount"))
-        )
-        result = TITLE_SHOP_LIST
-        result += "\n".join(
-            (
-                f'{ingredient["ingredient__name"]} - {ingredient["total"]}/'
-                f'{ingredient["ingredient__measurement_unit"]}'
-                for ingredient in ingredients
+        """
+        Скачать файл листа покупок в формате ?format=txt|csv|pdf.
+        Строки читаются курсором (.iterator()) по мере отдачи файла.
+        """
+        renderer = request.accepted_renderer
+        renderer.prepare()
+        rows = (
+            ShoppingListTotals.objects.filter(user=request.user)
+            .values(
+                "ingredient__name", "ingredient__measurement_unit", "total"
             )
+            .order_by("ingredient__name")
+            .iterator()
+        )
+        # Первая строка читается здесь: запрос выполняется до заголовков
+        # ответа и в той БД, которую выбрал роутер для этого запроса.
+        first = next(rows, None)
+        ingredients = chain(() if first is None else (first,), rows)
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients), content_type=renderer.content_type
+        )
+        response["Content-Disposition"] = (
+            f"attachment; filename={FILE_NAME}.{renderer.format}"
         )
-        response = HttpResponse(result, content_type="text/plain")
-        response["Content-Disposition"] = f"attachment; filename={FILE_NAME}"
         return response
 
 
-class FollowViewSet(UserViewSet):
+class FollowViewSet(CursorPaginationMixin, UserViewSet):
     """Класс взаимодействия с моделью Follow. Вьюсет подписок."""
 
+    cursor_ordering = ("id",)
+
+    def get_recipes_limit(self):
+        """Разбор параметра recipes_limit."""
+        limit = self.request.query_params.get("recipes_limit")
+        if not limit:
+            return None
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = -1
+        if limit < 0:
+            raise ValidationError(
+                {"recipes_limit": "Должно быть целое неотрицательное число."}
+            )
+        return limit
+
+    @staticmethod
+    def get_authors_recipes(authors, limit):
+        """
+        Последние рецепты авторов страницы одним запросом:
+        ROW_NUMBER() в разрезе автора отсекает лишние рецепты.
+        """
+        recipes = Recipes.objects.filter(author__in=authors).only(
+            "id", "name", "image", "cooking_time", "author_id"
+        )
+        if limit is None:
+            recipes = recipes.order_by("-pud_date", "-id")
+        else:
+            ranked = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("author")],
+                    order_by=[F("pud_date").desc(), F("id").desc()],
+                )
+            ).order_by()
+            sql, params = ranked.query.sql_with_params()
+            recipes = Recipes.objects.raw(
+                f"SELECT * FROM ({sql}) ranked "
+                "WHERE ranked.row_number <= %s ORDER BY ranked.row_number",
+                (*params, limit),
+            )
+        authors_recipes = defaultdict(list)
+        for recipe in recipes:
+            authors_recipes[recipe.author_id].append(recipe)
+        return authors_recipes
+
     @action(
         methods=["POST"], detail=True, permission_classes=(IsAuthenticated,)
     )
@@ -204,45 +497,60 @@ class FollowViewSet(UserViewSet):
     def subscribe(self, request, id=None):
         """Подписка на автора."""
         user = request.user
-        author = get_object_or_404(User, pk=id)
-        data = {
-            "user": user.id,
-            "author": author.id,
-        }
-        serializer = CheckFollowSerializer(
-            data=data,
-            context={"request": request},
+        if not Follow.objects.link(user, id):
+            self.raise_unchanged(request, id)
+        serializer = FollowSerializer(
+            Follow.objects.select_related("author__counters").get(
+                user=user, author=id
+            ),
+            context={
+                "request": request,
+                "recipes_limit": self.get_recipes_limit(),
+            },
         )
-        serializer.is_valid(raise_exception=True)
-        result = Follow.objects.create(user=user, author=author)
-        serializer = FollowSerializer(result, context={"request": request})
         return Response(serializer.data, status=HTTPStatus.CREATED)
 
     @subscribe.mapping.delete
     @transaction.atomic()
     def del_subscribe(self, request, id=None):
         """Отписка от автора."""
-        user = request.user
+        if not Follow.objects.unlink(request.user, id):
+            self.raise_unchanged(request, id)
+        return Response(status=HTTPStatus.NO_CONTENT)
+
+    @staticmethod
+    def raise_unchanged(request, id):
         author = get_object_or_404(User, pk=id)
-        data = {
-            "user": user.id,
-            "author": author.id,
-        }
-        serializer = CheckFollowSerializer(
-            data=data,
-            context={"request": request},
+        raise_unchanged(
+            CheckFollowSerializer,
+            request,
+            {"user": request.user.id, "author": author.id},
         )
-        serializer.is_valid(raise_exception=True)
-        user.follower.filter(author=author).delete()
-        return Response(status=HTTPStatus.NO_CONTENT)
 
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         """Подписки."""
         user = request.user
-        queryset = user.follower.all()
+        queryset = user.follower.select_related("author__counters")
         pages = self.paginate_queryset(queryset)
+        authors = [follow.author_id for follow in pages]
         serializer = FollowSerializer(
-            pages, many=True, context={"request": request}
+            pages,
+            many=True,
+            context={
+                "request": request,
+                "subscriptions": set(authors),
+                "recipes": self.get_authors_recipes(
+                    authors, self.get_recipes_limit()
+                ),
+            },
         )
         return self.get_paginated_response(serializer.data)
+
+
+@api_view(("GET",))
+@permission_classes((IsAdminUser,))
+def metrics(request):
+    """Метрики эндпоинтов в формате Prometheus."""
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+# Бэкенды, которые не делят данные между воркерами.
+PER_PROCESS_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Кэш alias виден всем воркерам, а не только текущему процессу."""
+    return settings.CACHES[alias]["BACKEND"] not in PER_PROCESS_CACHE_BACKENDS
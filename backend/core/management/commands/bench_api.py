@@ -0,0 +1,209 @@
+import json
+import platform
+import random
+import time
+import tracemalloc
+from statistics import mean, median
+
+from api.metrics import SQLRecorder
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from recipes.models import Ingredients, Recipes
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, round(fraction * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Замер задержки, запросов к БД и памяти основных эндпоинтов API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--allocation-requests",
+            type=int,
+            default=10,
+            help="Сколько запросов повторить с tracemalloc.",
+        )
+        parser.add_argument(
+            "--email",
+            help="Пользователь для запросов, по умолчанию с наибольшим "
+            "числом подписок.",
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            help="Замерить только указанные эндпоинты.",
+        )
+        parser.add_argument("--output", help="Сохранить результаты в JSON.")
+        parser.add_argument(
+            "--compare", help="JSON предыдущего запуска для сравнения."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        user = self.get_user(options["email"])
+        token, _ = Token.objects.get_or_create(user=user)
+        anonymous = Client(HTTP_HOST="localhost")
+        authorized = Client(
+            HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        endpoints = self.get_endpoints(anonymous, authorized)
+        if options["endpoint"]:
+            unknown = set(options["endpoint"]) - endpoints.keys()
+            if unknown:
+                raise CommandError(
+                    f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}."
+                )
+            endpoints = {
+                name: endpoints[name] for name in options["endpoint"]
+            }
+        results = {
+            name: self.measure(client, paths, options)
+            for name, (client, paths) in endpoints.items()
+        }
+        report = {
+            "created": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "requests": options["requests"],
+            "user": user.email,
+            "endpoints": results,
+        }
+        previous = self.load(options["compare"])
+        self.print_report(results, previous)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def get_user(email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            user = (
+                User.objects.annotate(total=Count("follower"))
+                .order_by("-total", "id")
+                .first()
+            )
+        if user is None:
+            raise CommandError(
+                "Пользователь не найден, сгенерируйте данные командой "
+                "generate_data."
+            )
+        return user
+
+    @staticmethod
+    def get_endpoints(anonymous, authorized):
+        recipe_ids = list(
+            Recipes.objects.order_by("?").values_list("id", flat=True)[:100]
+        )
+        names = list(
+            Ingredients.objects.order_by("?").values_list("name", flat=True)[
+                :100
+            ]
+        )
+        if not recipe_ids or not names:
+            raise CommandError("Нет данных, запустите generate_data.")
+        return {
+            "recipes_list": (authorized, ["/api/recipes/"]),
+            "recipes_list_anonymous": (anonymous, ["/api/recipes/"]),
+            "recipe_detail": (
+                authorized,
+                [f"/api/recipes/{pk}/" for pk in recipe_ids],
+            ),
+            "similar_recipes": (
+                authorized,
+                [f"/api/recipes/{pk}/similar/" for pk in recipe_ids],
+            ),
+            "subscriptions": (authorized, ["/api/users/subscriptions/"]),
+            "feed": (authorized, ["/api/recipes/feed/"]),
+            "tags": (authorized, ["/api/tags/"]),
+            "ingredients_search": (
+                authorized,
+                [f"/api/ingredients/?name={name[:2]}" for name in names],
+            ),
+            "download_shopping_cart": (
+                authorized,
+                ["/api/recipes/download_shopping_cart/"],
+            ),
+        }
+
+    @staticmethod
+    def fetch(client, path):
+        response = client.get(path)
+        response.getvalue()
+        return response.status_code
+
+    def measure(self, client, paths, options):
+        for _ in range(options["warmup"]):
+            self.fetch(client, random.choice(paths))
+        latencies, queries, statuses = [], [], set()
+        for _ in range(options["requests"]):
+            path = random.choice(paths)
+            # Запросы ко всем базам, включая реплику.
+            recorder = SQLRecorder()
+            with recorder.record():
+                started = time.perf_counter()
+                statuses.add(self.fetch(client, path))
+                latencies.append(time.perf_counter() - started)
+            queries.append(recorder.count)
+        peaks = []
+        for _ in range(options["allocation_requests"]):
+            tracemalloc.start()
+            self.fetch(client, random.choice(paths))
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        if statuses - {200}:
+            self.stderr.write(
+                f"{paths[0]}: ответы со статусами {sorted(statuses)}."
+            )
+        return {
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "mean_ms": round(mean(latencies) * 1000, 3),
+            "queries": median(queries),
+            "max_queries": max(queries),
+            "peak_kib": round(median(peaks) / 1024, 1) if peaks else None,
+            "statuses": sorted(statuses),
+        }
+
+    @staticmethod
+    def load(path):
+        if not path:
+            return {}
+        try:
+            with open(path, encoding="utf-8") as file:
+                return json.load(file)["endpoints"]
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f"Не удалось прочитать {path}: {error}")
+
+    def print_report(self, results, previous):
+        for name, result in results.items():
+            line = (
+                f"{name}: p50 {result['p50_ms']:.2f} мс, "
+                f"p95 {result['p95_ms']:.2f} мс, "
+                f"запросов к БД {result['queries']}, "
+                f"пик памяти {result['peak_kib']} КиБ"
+            )
+            before = previous.get(name)
+            if before:
+                line += " (было: " + ", ".join(
+                    f"{key} {before[key]}"
+                    for key in ("p50_ms", "p95_ms", "queries", "peak_kib")
+                    if key in before
+                ) + ")"
+            self.stdout.write(line)
@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from .bench_api import Command as BenchApiCommand
+from .bench_api import percentile
+
+READ_ENDPOINTS = (
+    "recipes_list",
+    "recipe_detail",
+    "tags",
+    "ingredients_search",
+    "subscriptions",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Пропускная способность запущенного сервера на эндпоинтах чтения "
+        "при разном числе одновременных запросов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            nargs="+",
+            default=[1, 4, 16, 64],
+            help="Числа одновременных запросов.",
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            help="Замерить только указанные эндпоинты.",
+        )
+        parser.add_argument("--email")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options["concurrency"]) < 1 or options["requests"] < 1:
+            raise CommandError("Числа должны быть положительными.")
+        random.seed(options["seed"])
+        user = BenchApiCommand.get_user(options["email"])
+        token, _ = Token.objects.get_or_create(user=user)
+        # Вместо тестовых клиентов — признак авторизованного запроса.
+        endpoints = BenchApiCommand.get_endpoints(False, True)
+        names = options["endpoint"] or READ_ENDPOINTS
+        unknown = set(names) - endpoints.keys()
+        if unknown:
+            raise CommandError(
+                f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}."
+            )
+        requests = []
+        for name in names:
+            authorized, paths = endpoints[name]
+            requests.extend((path, authorized) for path in paths)
+        headers = {"Authorization": f"Token {token.key}"}
+        for concurrency in options["concurrency"]:
+            plan = [
+                random.choice(requests) for _ in range(options["requests"])
+            ]
+            self.report(
+                concurrency,
+                *self.run(plan, concurrency, headers, options),
+            )
+
+    @staticmethod
+    def fetch(url, headers, timeout):
+        started = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers), timeout=timeout) as r:
+                r.read()
+                status = r.status
+        except HTTPError as error:
+            status = error.code
+        except (URLError, OSError):
+            status = None
+        return time.perf_counter() - started, status
+
+    def run(self, plan, concurrency, headers, options):
+        lock = threading.Lock()
+        queue = iter(plan)
+        results = []
+
+        def worker():
+            while True:
+                with lock:
+                    item = next(queue, None)
+                if item is None:
+                    return
+                path, authorized = item
+                results.append(
+                    self.fetch(
+                        options["url"].rstrip("/") + path,
+                        headers if authorized else {},
+                        options["timeout"],
+                    )
+                )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(concurrency):
+                executor.submit(worker)
+        return results, time.perf_counter() - started
+
+    def report(self, concurrency, results, elapsed):
+        latencies = [latency for latency, _ in results]
+        failed = sum(1 for _, status in results if status != 200)
+        self.stdout.write(
+            f"одновременно {concurrency}: "
+            f"{len(results) / elapsed:.1f} запросов/с, "
+            f"p50 {percentile(latencies, 0.5) * 1000:.1f} мс, "
+            f"p95 {percentile(latencies, 0.95) * 1000:.1f} мс, "
+            f"ошибок {failed}"
+        )
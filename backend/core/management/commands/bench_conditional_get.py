@@ -0,0 +1,94 @@
+import time
+from statistics import mean
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from recipes.models import Ingredients, Recipes
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Экономия трафика и времени условных GET на повторной навигации"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--trace",
+            help="Файл с путями запросов, по одному на строку.",
+        )
+        parser.add_argument("--recipes", type=int, default=20)
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument(
+            "--email", help="Выполнять запросы от имени пользователя."
+        )
+
+    def handle(self, *args, **options):
+        paths = self.load_trace(options)
+        if not paths:
+            raise CommandError("Пустая трасса навигации.")
+        headers = {"HTTP_HOST": "localhost"}
+        if options["email"]:
+            user = User.objects.filter(email=options["email"]).first()
+            if user is None:
+                raise CommandError("Пользователь не найден.")
+            token, _ = Token.objects.get_or_create(user=user)
+            headers["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+        client = Client(**headers)
+        etags = {}
+        results = {"plain": [], "conditional": []}
+        for _ in range(options["rounds"]):
+            for path in paths:
+                results["plain"].append(self.fetch(client, path))
+                status, size, elapsed, etag = self.fetch(
+                    client, path, etags.get(path)
+                )
+                if etag:
+                    etags[path] = etag
+                results["conditional"].append((status, size, elapsed, etag))
+        for title, key in (
+            ("Без условных GET", "plain"),
+            ("С If-None-Match", "conditional"),
+        ):
+            rows = results[key]
+            not_modified = sum(1 for row in rows if row[0] == 304)
+            latency = mean(row[2] for row in rows) * 1000
+            self.stdout.write(
+                f"{title}: запросов {len(rows)}, ответов 304 {not_modified}, "
+                f"байт {sum(row[1] for row in rows)}, "
+                f"средняя задержка {latency:.2f} мс"
+            )
+
+    @staticmethod
+    def load_trace(options):
+        if options["trace"]:
+            with open(options["trace"], encoding="utf-8") as file:
+                return [line.strip() for line in file if line.strip()]
+        paths = ["/api/tags/", "/api/ingredients/"]
+        paths += [
+            f"/api/ingredients/?name={name[:2]}"
+            for name in Ingredients.objects.values_list("name", flat=True)[
+                :5
+            ]
+        ]
+        paths += [
+            f"/api/recipes/{pk}/"
+            for pk in Recipes.objects.values_list("pk", flat=True)[
+                : options["recipes"]
+            ]
+        ]
+        return paths
+
+    @staticmethod
+    def fetch(client, path, etag=None):
+        extra = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        started = time.perf_counter()
+        response = client.get(path, **extra)
+        elapsed = time.perf_counter() - started
+        return (
+            response.status_code,
+            len(response.content),
+            elapsed,
+            response.get("ETag"),
+        )
@@ -0,0 +1,145 @@
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from recipes.models import (
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    ShoppingLists,
+    ShoppingListTotals,
+)
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipesViewSet
+
+User = get_user_model()
+
+TITLE_SHOP_LIST = "Список покупок с сайта Foodgram:\n\n"
+
+
+def legacy_download(user):
+    """Выгрузка в прежнем виде: агрегация и одна строка в памяти."""
+    ingredients = (
+        IngredientsInRecipe.objects.filter(recipe__list__user=user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .order_by("ingredient__name")
+        .annotate(total=Sum("amount"))
+    )
+    result = TITLE_SHOP_LIST
+    result += "\n".join(
+        (
+            f'{ingredient["ingredient__name"]} - {ingredient["total"]}/'
+            f'{ingredient["ingredient__measurement_unit"]}'
+            for ingredient in ingredients
+        )
+    )
+    return HttpResponse(result, content_type="text/plain")
+
+
+class Command(BaseCommand):
+    help = "Сравнение выгрузки списка покупок с прежней реализацией"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=2000)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=15)
+        parser.add_argument(
+            "--format", default="txt", choices=("txt", "csv", "pdf")
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredients.objects.values_list("id", flat=True))
+        if len(ingredient_ids) < options["ingredients_per_recipe"]:
+            raise CommandError("Сначала загрузите ингредиенты.")
+        random.seed(options["seed"])
+        with transaction.atomic():
+            user = self.create_cart(ingredient_ids, options)
+            legacy = self.measure(lambda: legacy_download(user))
+            streaming = self.measure(
+                lambda: self.streaming_download(user, options["format"])
+            )
+            transaction.set_rollback(True)
+        for title, result in (
+            ("Прежняя выгрузка (txt)", legacy),
+            (f"Потоковая выгрузка ({options['format']})", streaming),
+        ):
+            self.stdout.write(
+                f"{title}: первый байт {result['ttfb'] * 1000:.1f} мс, "
+                f"всего {result['total'] * 1000:.1f} мс, "
+                f"пик памяти {result['peak'] / 1024:.1f} КиБ, "
+                f"размер {result['size']} байт"
+            )
+
+    @staticmethod
+    def create_cart(ingredient_ids, options):
+        user = User.objects.create_user(
+            username="bench_shopping_list",
+            email="bench_shopping_list@example.com",
+            password=None,
+        )
+        Recipes.objects.bulk_create(
+            Recipes(
+                author=user,
+                name=f"Рецепт {number}",
+                text="Синтетический рецепт",
+                cooking_time=10,
+            )
+            for number in range(options["recipes"])
+        )
+        recipes = Recipes.objects.filter(author=user)
+        IngredientsInRecipe.objects.bulk_create(
+            (
+                IngredientsInRecipe(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient_id in random.sample(
+                    ingredient_ids, options["ingredients_per_recipe"]
+                )
+            ),
+            batch_size=500,
+        )
+        ShoppingLists.objects.bulk_create(
+            (ShoppingLists(user=user, recipe=recipe) for recipe in recipes),
+            batch_size=500,
+        )
+        ShoppingListTotals.objects.refresh([user.id], ingredient_ids)
+        return user
+
+    @staticmethod
+    def streaming_download(user, export_format):
+        request = APIRequestFactory().get(
+            "/api/recipes/download_shopping_cart/", {"format": export_format}
+        )
+        force_authenticate(request, user=user)
+        view = RecipesViewSet.as_view(
+            {"get": "download_shopping_cart"},
+            **RecipesViewSet.download_shopping_cart.kwargs,
+        )
+        return view(request)
+
+    @staticmethod
+    def measure(download):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = download()
+        if response.streaming:
+            chunks = iter(response.streaming_content)
+            size = len(next(chunks, b""))
+            ttfb = time.perf_counter() - started
+            size += sum(len(chunk) for chunk in chunks)
+        else:
+            size = len(response.content)
+            ttfb = time.perf_counter() - started
+        total = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"ttfb": ttfb, "total": total, "peak": peak, "size": size}
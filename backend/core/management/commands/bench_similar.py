@@ -0,0 +1,86 @@
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.similar import (
+    SimilarityMatrix,
+    build_matrix,
+    load_matrix,
+    save_matrix,
+)
+
+from .bench_api import percentile
+
+
+def synthetic_pairs(rng, recipes, features, per_recipe):
+    """Пары (рецепт, признак) с признаками по закону Ципфа."""
+    weights = 1 / np.arange(1, features + 1) ** 1.1
+    counts = np.maximum(rng.poisson(per_recipe, recipes), 1)
+    return (
+        np.repeat(np.arange(1, recipes + 1), counts),
+        rng.choice(features, counts.sum(), p=weights / weights.sum()) + 1,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер сборки матрицы похожих рецептов и поиска по ней "
+        "на синтетических каталогах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10000, 100000, 1000000],
+            help="Размеры каталогов в рецептах.",
+        )
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument("--tags", type=int, default=10)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--tags-per-recipe", type=int, default=2)
+        parser.add_argument("--lookups", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=6)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options["sizes"]) < 1 or options["lookups"] < 1:
+            raise CommandError("Размеры и число поисков должны быть больше 0.")
+        rng = np.random.default_rng(options["seed"])
+        for size in options["sizes"]:
+            self.measure(rng, size, options)
+
+    def measure(self, rng, size, options):
+        ingredients = synthetic_pairs(
+            rng,
+            size,
+            options["ingredients"],
+            options["ingredients_per_recipe"],
+        )
+        tags = synthetic_pairs(
+            rng, size, options["tags"], options["tags_per_recipe"]
+        )
+        started = time.perf_counter()
+        arrays = build_matrix(ingredients, tags)
+        built = time.perf_counter() - started
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_matrix(arrays, directory, timezone.now())
+            matrix = SimilarityMatrix(load_matrix(path)[0])
+            latencies = []
+            for recipe_id in rng.integers(1, size + 1, options["lookups"]):
+                started = time.perf_counter()
+                row = matrix.row(recipe_id)
+                if row is not None:
+                    matrix.top(matrix.vector(row), options["limit"] + 1)
+                latencies.append(time.perf_counter() - started)
+        megabytes = sum(array.nbytes for array in arrays.values()) / 2 ** 20
+        self.stdout.write(
+            f"{size} рецептов: сборка {built:.2f} с, "
+            f"матрица {megabytes:.1f} МиБ, "
+            f"поиск p50 {percentile(latencies, 0.5) * 1000:.2f} мс, "
+            f"p95 {percentile(latencies, 0.95) * 1000:.2f} мс"
+        )
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.similar import build_from_database, save_matrix
+
+
+class Command(BaseCommand):
+    help = "Сборка матрицы похожих рецептов для отображения в память"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        arrays, built_at = build_from_database()
+        path = save_matrix(arrays, settings.SIMILAR_INDEX_DIR, built_at)
+        size = sum(array.nbytes for array in arrays.values())
+        self.stdout.write(
+            f"Рецептов: {len(arrays['recipe_ids'])}, "
+            f"признаков: {len(arrays['idf'])}, "
+            f"ненулевых элементов: {len(arrays['data'])}, "
+            f"размер: {size / 2 ** 20:.1f} МиБ, "
+            f"время: {time.perf_counter() - started:.1f} с. "
+            f"Матрица записана в {path}."
+        )
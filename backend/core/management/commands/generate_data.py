@@ -0,0 +1,240 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from recipes.models import (
+    FavouriteRecipes,
+    Ingredients,
+    IngredientsInRecipe,
+    Recipes,
+    ShoppingLists,
+    TableVersions,
+    Tags,
+)
+from users.models import Follow
+
+from api.cache import bump_recipes_generation
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+PASSWORD = "bench-password"
+TAG_NAMES = (
+    "Завтрак",
+    "Обед",
+    "Ужин",
+    "Десерт",
+    "Выпечка",
+    "Салат",
+    "Суп",
+    "Напиток",
+    "Постное",
+    "Быстро",
+)
+
+
+def zipf_weights(count, exponent=1.1):
+    """Накопленные веса распределения Ципфа для random.choices."""
+    return list(
+        accumulate(1 / rank ** exponent for rank in range(1, count + 1))
+    )
+
+
+def sample(population, cum_weights, count):
+    """До count различных элементов с учетом весов."""
+    count = min(count, len(population))
+    chosen = set()
+    for _ in range(count * 4):
+        chosen.add(random.choices(population, cum_weights=cum_weights)[0])
+        if len(chosen) == count:
+            break
+    return chosen
+
+
+def added_at(recipe, now):
+    """Случайный момент между публикацией рецепта и now."""
+    return recipe.pud_date + (now - recipe.pud_date) * random.random()
+
+
+class Command(BaseCommand):
+    help = "Генерация синтетических данных для нагрузочных замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--recipes", type=int, default=2000)
+        parser.add_argument("--tags", type=int, default=len(TAG_NAMES))
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--follows-per-user", type=int, default=15)
+        parser.add_argument("--favorites-per-user", type=int, default=30)
+        parser.add_argument("--cart-per-user", type=int, default=5)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="bench")
+
+    def handle(self, *args, **options):
+        if options["users"] < 2 or options["recipes"] < 1:
+            raise CommandError("Нужно хотя бы два пользователя и один рецепт.")
+        ingredient_ids = list(
+            Ingredients.objects.order_by("?").values_list("id", flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError(
+                "Сначала загрузите ингредиенты командой load_ingredients."
+            )
+        random.seed(options["seed"])
+        with transaction.atomic():
+            tags = self.create_tags(options["tags"])
+            users = self.create_users(options)
+            recipes = self.create_recipes(users, options)
+            self.create_recipe_links(recipes, tags, ingredient_ids, options)
+            self.create_graphs(users, recipes, options)
+        call_command("reconcile_counters", stdout=self.stdout)
+        call_command("rebuild_shopping_totals", stdout=self.stdout)
+        call_command("rebuild_feed", stdout=self.stdout)
+        call_command("refresh_rankings", stdout=self.stdout)
+        TableVersions.objects.bump(Tags._meta.db_table)
+        bump_recipes_generation()
+        self.stdout.write(
+            f"Создано пользователей: {len(users)}, рецептов: {len(recipes)}. "
+            f"Пароль пользователей: {PASSWORD}."
+        )
+
+    @staticmethod
+    def create_tags(count):
+        tags = []
+        for number in range(count):
+            name = (
+                TAG_NAMES[number]
+                if number < len(TAG_NAMES)
+                else f"Тег {number}"
+            )
+            tag, _ = Tags.objects.get_or_create(
+                slug=f"tag-{number}",
+                defaults={"name": name, "color": f"#{number * 9973:06x}"},
+            )
+            tags.append(tag)
+        return tags
+
+    @staticmethod
+    def create_users(options):
+        prefix = options["prefix"]
+        start = User.objects.filter(username__startswith=f"{prefix}_").count()
+        password = make_password(PASSWORD)
+        usernames = [
+            f"{prefix}_{number}"
+            for number in range(start, start + options["users"])
+        ]
+        User.objects.bulk_create(
+            (
+                User(
+                    username=username,
+                    email=f"{username}@example.com",
+                    first_name="Пользователь",
+                    last_name=username,
+                    password=password,
+                )
+                for username in usernames
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return list(User.objects.filter(username__in=usernames))
+
+    @staticmethod
+    def create_recipes(users, options):
+        authors = zipf_weights(len(users))
+        now = timezone.now()
+        recipes = [
+            Recipes(
+                author=random.choices(users, cum_weights=authors)[0],
+                name=f"Рецепт {number}",
+                text="Синтетический рецепт для замеров производительности.",
+                cooking_time=random.randint(5, 180),
+            )
+            for number in range(options["recipes"])
+        ]
+        created = Recipes.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        if not created or created[0].pk is None:
+            created = list(
+                Recipes.objects.filter(author__in=users).order_by("id")
+            )
+        for recipe in created:
+            recipe.pud_date = now - timedelta(
+                seconds=random.randint(0, options["days"] * 86400)
+            )
+            recipe.modified = recipe.pud_date
+        Recipes.objects.bulk_update(
+            created, ("pud_date", "modified"), batch_size=BATCH_SIZE
+        )
+        return created
+
+    @staticmethod
+    def create_recipe_links(recipes, tags, ingredient_ids, options):
+        tag_weights = zipf_weights(len(tags))
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        mean = options["ingredients_per_recipe"]
+        tag_links, amounts = [], []
+        for recipe in recipes:
+            for tag in sample(tags, tag_weights, random.randint(1, 3)):
+                tag_links.append(
+                    Recipes.tags.through(recipes_id=recipe.pk, tags_id=tag.pk)
+                )
+            count = max(1, round(random.gauss(mean, mean / 3)))
+            for ingredient_id in sample(
+                ingredient_ids, ingredient_weights, count
+            ):
+                amounts.append(
+                    IngredientsInRecipe(
+                        recipe=recipe,
+                        ingredient_id=ingredient_id,
+                        amount=random.randint(1, 500),
+                    )
+                )
+        Recipes.tags.through.objects.bulk_create(
+            tag_links, batch_size=BATCH_SIZE
+        )
+        IngredientsInRecipe.objects.bulk_create(amounts, batch_size=BATCH_SIZE)
+
+    @staticmethod
+    def create_graphs(users, recipes, options):
+        user_weights = zipf_weights(len(users))
+        recipe_weights = zipf_weights(len(recipes))
+        now = timezone.now()
+        follows, favourites, lists = [], [], []
+        for user in users:
+            for author in sample(
+                users, user_weights, options["follows_per_user"] + 1
+            ):
+                if author != user:
+                    follows.append(Follow(user=user, author=author))
+            for recipe in sample(
+                recipes, recipe_weights, options["favorites_per_user"]
+            ):
+                favourites.append(
+                    FavouriteRecipes(
+                        user=user,
+                        recipe=recipe,
+                        created=added_at(recipe, now),
+                    )
+                )
+            for recipe in sample(
+                recipes, recipe_weights, options["cart_per_user"]
+            ):
+                lists.append(
+                    ShoppingLists(
+                        user=user, recipe=recipe, created=added_at(recipe, now)
+                    )
+                )
+        for model, objects in (
+            (Follow, follows),
+            (FavouriteRecipes, favourites),
+            (ShoppingLists, lists),
+        ):
+            model.objects.bulk_create(
+                objects, batch_size=BATCH_SIZE, ignore_conflicts=True
+            )
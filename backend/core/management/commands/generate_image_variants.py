@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from recipes.models import Recipes
+
+from api.images import generate_variants
+
+
+class Command(BaseCommand):
+    help = "Создание вариантов картинок для уже загруженных рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересоздать варианты и для рецептов, где они уже есть.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipes.objects.exclude(Q(image="") | Q(image__isnull=True))
+        if not options["all"]:
+            recipes = recipes.filter(
+                Q(image_thumbnail="") | Q(image_thumbnail__isnull=True)
+            )
+        processed = failed = 0
+        for recipe_id in recipes.values_list("id", flat=True).iterator():
+            try:
+                generate_variants(recipe_id)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f"Рецепт {recipe_id}: {error}")
+            else:
+                processed += 1
+        self.stdout.write(
+            f"Обработано картинок: {processed}, с ошибками: {failed}."
+        )
@@ -1,25 +1,195 @@
-from csv import DictReader
+import csv
+import io
+import json
+import os
+import time
 
-from django.core.management.base import BaseCommand
-from recipes.models import Ingredients
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.models import Ingredients, TableVersions
 
+FIELDS = ("name", "measurement_unit")
+JSON_EXTENSIONS = (".json", ".jsonl", ".ndjson")
+JSON_CHUNK_SIZE = 64 * 1024
+MAX_LENGTH = Ingredients._meta.get_field("name").max_length
+
+
+def read_csv(file, delimiter):
+    """Строки CSV с номерами, заголовок name,measurement_unit пропускается."""
+    reader = csv.reader(file, delimiter=delimiter)
+    for row in reader:
+        if reader.line_num == 1 and tuple(
+            cell.strip() for cell in row
+        ) == FIELDS:
+            continue
+        yield reader.line_num, row
 
-class Command(BaseCommand):
-    help = "Конвертирование из csv файла"
 
-    def handle(self, *args, **kwargs):
-        if Ingredients.objects.exists():
-            print("Данные уже загружены!")
+def read_json_array(file):
+    """Элементы JSON-массива по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидался JSON-массив.")
+    buffer = buffer[1:]
+    number = 0
+    while True:
+        buffer = buffer.lstrip()
+        if number and buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith("]"):
             return
         try:
-            with open("./data/ingredients.csv", "r", encoding="utf-8") as file:
-                reader = DictReader(file)
-                Ingredients.objects.bulk_create(
-                    Ingredients(**data) for data in reader
+            value, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError(
+                    f"Некорректный JSON после элемента {number}."
+                )
+            buffer += chunk
+            continue
+        number += 1
+        yield number, value
+        buffer = buffer[end:]
+
+
+def read_json(file):
+    """JSON-массив или JSON Lines, формат определяется по первому символу."""
+    first = file.read(1)
+    while first.isspace():
+        first = file.read(1)
+    file.seek(0)
+    if first == "[":
+        yield from read_json_array(file)
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as error:
+            yield number, error
+
+
+def clean(value):
+    """Пара (название, единица измерения) или ValueError с причиной."""
+    if isinstance(value, Exception):
+        raise ValueError(str(value))
+    if isinstance(value, dict):
+        value = (value.get("name"), value.get("measurement_unit"))
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError("ожидались название и единица измерения")
+    if not all(isinstance(field, str) for field in value):
+        raise ValueError("значения должны быть строками")
+    name, measurement_unit = (field.strip() for field in value)
+    if not name or not measurement_unit:
+        raise ValueError("пустое значение")
+    if len(name) > MAX_LENGTH or len(measurement_unit) > MAX_LENGTH:
+        raise ValueError(f"значение длиннее {MAX_LENGTH} символов")
+    return name, measurement_unit
+
+
+def insert_batch(rows):
+    """Добавить ингредиенты, уже существующие пары пропускаются."""
+    Ingredients.objects.bulk_create(
+        (
+            Ingredients(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in rows
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def copy_batch(rows):
+    """То же через COPY во временную таблицу для PostgreSQL."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    table = connection.ops.quote_name(Ingredients._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS ingredients_load "
+            f"(name varchar({MAX_LENGTH}), "
+            f"measurement_unit varchar({MAX_LENGTH})) "
+            "ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(
+            "COPY ingredients_load (name, measurement_unit) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            f"INSERT INTO {table} (name, measurement_unit) "
+            "SELECT name, measurement_unit FROM ingredients_load "
+            "ON CONFLICT (name, measurement_unit) DO NOTHING"
+        )
+
+
+class Command(BaseCommand):
+    help = "Загрузка и обновление ингредиентов из CSV или JSON файла"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default=os.path.join("data", "ingredients.csv")
+        )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "json"),
+            help="Формат файла, по умолчанию определяется по расширению.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--delimiter", default=",")
+        parser.add_argument("--encoding", default="utf-8")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным.")
+        file_format = options["format"] or (
+            "json"
+            if options["path"].lower().endswith(JSON_EXTENSIONS)
+            else "csv"
+        )
+        write_batch = (
+            copy_batch if connection.vendor == "postgresql" else insert_batch
+        )
+        before = Ingredients.objects.count()
+        started = time.perf_counter()
+        read = rejected = 0
+        try:
+            with open(
+                options["path"], encoding=options["encoding"], newline=""
+            ) as file:
+                records = (
+                    read_json(file)
+                    if file_format == "json"
+                    else read_csv(file, options["delimiter"])
                 )
-        except ValueError:
-            print("Неопределенное значение.")
-        except Exception:
-            print("Что-то пошло не так!")
-        else:
-            print("Данные загружены!")
+                batch = {}
+                for number, value in records:
+                    read += 1
+                    try:
+                        batch[clean(value)] = None
+                    except ValueError as error:
+                        rejected += 1
+                        self.stderr.write(f"Строка {number}: {error}.")
+                        continue
+                    if len(batch) >= options["batch_size"]:
+                        with transaction.atomic():
+                            write_batch(list(batch))
+                        batch.clear()
+                if batch:
+                    with transaction.atomic():
+                        write_batch(list(batch))
+        except (OSError, UnicodeDecodeError) as error:
+            raise CommandError(f"Не удалось прочитать файл: {error}")
+        elapsed = time.perf_counter() - started
+        added = Ingredients.objects.count() - before
+        if added:
+            TableVersions.objects.bump(Ingredients._meta.db_table)
+        self.stdout.write(
+            f"Прочитано строк: {read}, добавлено: {added}, "
+            f"пропущено повторов: {read - rejected - added}, "
+            f"отклонено: {rejected}. "
+            f"Скорость: {read / elapsed if elapsed else read:.0f} строк/с."
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import FeedEntries
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = "Пересборка лент подписок по текущим подпискам"
+
+    def handle(self, *args, **options):
+        FeedEntries.objects.all().delete()
+        heavy = FeedEntries.objects.heavy(Follow.objects.values("author"))
+        follows = Follow.objects.exclude(author__in=heavy)
+        authors = follows.values_list("author", flat=True).distinct()
+        for author_id in authors.order_by("author").iterator():
+            with transaction.atomic():
+                FeedEntries.objects.backfill(
+                    list(
+                        follows.filter(author=author_id).values_list(
+                            "user", flat=True
+                        )
+                    ),
+                    author_id,
+                )
+        self.stdout.write(
+            f"Записей в лентах: {FeedEntries.objects.count()}, "
+            f"авторов: {authors.count()}."
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingListTotals
+
+
+class Command(BaseCommand):
+    help = "Пересчет сумм ингредиентов в списках покупок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить расхождения, ничего не изменяя.",
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            (row["user"], row["recipe__ingredients_amount__ingredient"]): row[
+                "total"
+            ]
+            for row in ShoppingListTotals.objects.aggregate_lists(
+                recipe__ingredients_amount__isnull=False
+            ).iterator()
+        }
+        stored = {
+            (user, ingredient): total
+            for user, ingredient, total in (
+                ShoppingListTotals.objects.values_list(
+                    "user", "ingredient", "total"
+                ).iterator()
+            )
+        }
+        drift = [
+            key
+            for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        if options["check"]:
+            if drift:
+                raise CommandError(f"Найдено расхождений: {len(drift)}.")
+            self.stdout.write("Суммы списков покупок актуальны.")
+            return
+        with transaction.atomic():
+            ShoppingListTotals.objects.all().delete()
+            ShoppingListTotals.objects.bulk_create(
+                (
+                    ShoppingListTotals(
+                        user_id=user, ingredient_id=ingredient, total=total
+                    )
+                    for (user, ingredient), total in expected.items()
+                ),
+                batch_size=500,
+            )
+        self.stdout.write(
+            f"Пересчитано сумм: {len(expected)}, "
+            f"исправлено расхождений: {len(drift)}."
+        )
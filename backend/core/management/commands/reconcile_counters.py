@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from recipes.models import FavouriteRecipes, Recipes
+from users.models import Follow, UserCounters
+
+User = get_user_model()
+
+
+def count_by(queryset, field):
+    """Количество строк queryset для каждого значения field."""
+    return dict(
+        queryset.values(field)
+        .annotate(total=Count("id"))
+        .order_by()
+        .values_list(field, "total")
+    )
+
+
+class Command(BaseCommand):
+    help = "Сверка и исправление денормализованных счетчиков"
+
+    @transaction.atomic()
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Исправлено счетчиков пользователей: {self.reconcile_users()}."
+        )
+        self.stdout.write(
+            f"Исправлено счетчиков рецептов: {self.reconcile_recipes()}."
+        )
+
+    @staticmethod
+    def reconcile_users():
+        recipes = count_by(Recipes.objects.all(), "author")
+        followers = count_by(Follow.objects.all(), "author")
+        existing = UserCounters.objects.in_bulk()
+        missing, drifted = [], []
+        for user_id in User.objects.values_list("id", flat=True).iterator():
+            actual = UserCounters(
+                user_id=user_id,
+                recipes_count=recipes.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+            )
+            stored = existing.get(user_id)
+            if stored is None:
+                missing.append(actual)
+            elif (stored.recipes_count, stored.followers_count) != (
+                actual.recipes_count,
+                actual.followers_count,
+            ):
+                drifted.append(actual)
+        UserCounters.objects.bulk_create(missing, batch_size=500)
+        UserCounters.objects.bulk_update(
+            drifted, ("recipes_count", "followers_count"), batch_size=500
+        )
+        return len(missing) + len(drifted)
+
+    @staticmethod
+    def reconcile_recipes():
+        favorites = count_by(FavouriteRecipes.objects.all(), "recipe")
+        drifted = []
+        for recipe in Recipes.objects.only("id", "favorites_count").iterator():
+            actual = favorites.get(recipe.id, 0)
+            if recipe.favorites_count != actual:
+                recipe.favorites_count = actual
+                drifted.append(recipe)
+        Recipes.objects.bulk_update(
+            drifted, ("favorites_count",), batch_size=500
+        )
+        return len(drifted)
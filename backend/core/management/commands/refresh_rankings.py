@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.models import RecipeRankings
+
+from api.cache import bump_recipes_generation
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчет рейтингов популярных и набирающих популярность "
+        "рецептов, для запуска по cron"
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = RecipeRankings.objects.refresh()
+        bump_recipes_generation()
+        self.stdout.write(
+            f"Рецептов в рейтинге: {count}, "
+            f"время: {time.perf_counter() - started:.1f} с."
+        )
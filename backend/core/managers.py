@@ -0,0 +1,189 @@
+from django.db import connections, models, transaction
+
+
+def can_return_rows(connection):
+    """INSERT и DELETE с RETURNING: PostgreSQL и SQLite с версии 3.35."""
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+class LinkManager(models.Manager):
+    """
+    Связи пользователя с объектами (подписки, избранное, список покупок),
+    которые добавляются и удаляются одним запросом без гонок.
+    Сигналы при этом не отправляются, поэтому производные данные
+    (счетчики, суммы, ленты) обновляет links_changed в той же транзакции.
+    Поле связи с объектом задает атрибут target.
+    """
+
+    target = None
+
+    def links_changed(self, user_id, targets, delta):
+        """
+        Обновить производные данные после того, как связи пользователя
+        с объектами targets добавлены (delta=1) или удалены (delta=-1).
+        """
+
+    def prepare(self, value):
+        """Значение первичного ключа объекта или None, если оно неверно."""
+        field = self.model._meta.get_field(self.target).target_field
+        try:
+            return field.get_prep_value(getattr(value, "pk", value))
+        except (TypeError, ValueError):
+            return None
+
+    def _insert_statement(self, user, targets):
+        """
+        INSERT связей пользователя с существующими объектами targets,
+        которых еще нет. Остальные поля получают значения по умолчанию.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        field = opts.get_field(self.target)
+        target_opts = field.related_model._meta
+        target_pk = quote_name(target_opts.pk.column)
+        columns = [
+            quote_name(opts.get_field("user").column),
+            quote_name(field.column),
+        ]
+        select, params = ["%s", target_pk], [user.pk]
+        instance = self.model()
+        for other in opts.local_concrete_fields:
+            if other.primary_key or other.name in ("user", self.target):
+                continue
+            columns.append(quote_name(other.column))
+            select.append("%s")
+            params.append(
+                other.get_db_prep_save(
+                    other.pre_save(instance, True), connection
+                )
+            )
+        sql = (
+            f"{connection.ops.insert_statement(ignore_conflicts=True)} "
+            f"{quote_name(opts.db_table)} ({', '.join(columns)}) "
+            f"SELECT {', '.join(select)} "
+            f"FROM {quote_name(target_opts.db_table)} "
+            f"WHERE {target_pk} IN ({', '.join(['%s'] * len(targets))}) "
+            f"{connection.ops.ignore_conflicts_suffix_sql(True)}"
+        )
+        return sql, (*params, *targets)
+
+    def _delete_statement(self, user, targets):
+        """
+        DELETE связей пользователя с объектами targets. QuerySet.delete()
+        отправил бы сигналы, а links_changed уже обновляет все нужное.
+        """
+        quote_name = connections[self.db].ops.quote_name
+        opts = self.model._meta
+        sql = (
+            f"DELETE FROM {quote_name(opts.db_table)} "
+            f"WHERE {quote_name(opts.get_field('user').column)} = %s "
+            f"AND {quote_name(opts.get_field(self.target).column)} "
+            f"IN ({', '.join(['%s'] * len(targets))})"
+        )
+        return sql, (user.pk, *targets)
+
+    def _write(self, statement, user, targets):
+        """
+        Выполнить INSERT или DELETE связей и вернуть объекты, связи
+        с которыми изменил именно этот запрос. С RETURNING это один
+        запрос, иначе по запросу на объект с проверкой rowcount.
+        """
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            if can_return_rows(connection):
+                sql, params = statement(user, targets)
+                column = self.model._meta.get_field(self.target).column
+                cursor.execute(
+                    f"{sql} RETURNING {connection.ops.quote_name(column)}",
+                    params,
+                )
+                return [row[0] for row in cursor.fetchall()]
+            changed = []
+            for target in targets:
+                cursor.execute(*statement(user, [target]))
+                if cursor.rowcount == 1:
+                    changed.append(target)
+            return changed
+
+    def _prepare_many(self, targets):
+        """Верные значения из targets без повторов."""
+        return list(
+            dict.fromkeys(
+                target
+                for target in map(self.prepare, targets)
+                if target is not None
+            )
+        )
+
+    @transaction.atomic(savepoint=False)
+    def link(self, user, target):
+        """
+        Добавить связь, если объект существует и связи еще нет.
+        Возвращает True, если связь добавлена.
+        """
+        target = self.prepare(target)
+        if target is None:
+            return False
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(*self._insert_statement(user, [target]))
+            linked = cursor.rowcount == 1
+        if linked:
+            self.links_changed(user.pk, [target], 1)
+        return linked
+
+    @transaction.atomic(savepoint=False)
+    def unlink(self, user, target):
+        """Удалить связь одним DELETE. Возвращает True, если она была."""
+        target = self.prepare(target)
+        if target is None:
+            return False
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(*self._delete_statement(user, [target]))
+            unlinked = cursor.rowcount == 1
+        if unlinked:
+            self.links_changed(user.pk, [target], -1)
+        return unlinked
+
+    @transaction.atomic(savepoint=False)
+    def link_many(self, user, targets):
+        """
+        Добавить связи с существующими объектами из targets.
+        Возвращает словарь {объект: True, если связь добавлена этим
+        вызовом, False, если она уже была}; несуществующих объектов
+        в нем нет.
+        """
+        targets = self._prepare_many(targets)
+        if not targets:
+            return {}
+        created = self._write(self._insert_statement, user, targets)
+        if created:
+            self.links_changed(user.pk, created, 1)
+        related = self.model._meta.get_field(self.target).related_model
+        existing = (
+            related.objects.filter(pk__in=targets)
+            .exclude(pk__in=created)
+            .values_list("pk", flat=True)
+        )
+        return {
+            **{pk: False for pk in existing},
+            **{pk: True for pk in created},
+        }
+
+    @transaction.atomic(savepoint=False)
+    def unlink_many(self, user, targets):
+        """
+        Удалить связи с объектами из targets. Возвращает объекты,
+        связи с которыми удалил этот вызов.
+        """
+        targets = self._prepare_many(targets)
+        if not targets:
+            return set()
+        deleted = set(self._write(self._delete_statement, user, targets))
+        if deleted:
+            self.links_changed(user.pk, deleted, -1)
+        return deleted
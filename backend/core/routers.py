@@ -0,0 +1,107 @@
+from contextvars import ContextVar
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import cache_is_shared
+
+STICKY_KEY = "replica:sticky:{}"
+# Токен, выданный только что, может еще не дойти до реплики.
+PRIMARY_APPS = ("authtoken", "sessions")
+
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_configured():
+    return settings.REPLICA_DATABASE in settings.DATABASES
+
+
+def client_key(request):
+    """
+    Ключ клиента по заголовку Authorization или cookie сессии, без
+    обращения к БД. None для анонимных запросов.
+    """
+    credentials = request.META.get(
+        "HTTP_AUTHORIZATION"
+    ) or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return STICKY_KEY.format(md5(credentials.encode()).hexdigest())
+
+
+class ReplicaRouter:
+    """
+    Чтение из реплики, когда его разрешил ReplicaMiddleware,
+    запись и все остальные чтения — в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            replica_reads.get()
+            and replica_configured()
+            and model._meta.app_label not in PRIMARY_APPS
+        ):
+            return settings.REPLICA_DATABASE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = (DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Безопасные запросы к вьюсетам из REPLICA_VIEWSETS читают из реплики.
+    После записи запросы того же клиента REPLICA_STICKY_SECONDS идут
+    в основную БД, чтобы он сразу видел свои изменения. Отметка о записи
+    хранится в кэше, поэтому он должен быть общим для воркеров.
+    """
+
+    def __init__(self, get_response):
+        if replica_configured() and not cache_is_shared():
+            raise ImproperlyConfigured(
+                "Для чтения из реплики нужен общий для воркеров кэш: "
+                "задайте CACHE_BACKEND и CACHE_LOCATION, например Redis "
+                "или Memcached."
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = replica_reads.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            key = client_key(request)
+            if key is not None:
+                cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or not replica_configured():
+            return
+        cls = getattr(view_func, "cls", None)
+        if (
+            cls is None
+            or f"{cls.__module__}.{cls.__name__}"
+            not in settings.REPLICA_VIEWSETS
+        ):
+            return
+        key = client_key(request)
+        if key is None or not cache.get(key):
+            replica_reads.set(True)
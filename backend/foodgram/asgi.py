@@ -0,0 +1,58 @@
+"""
+ASGI config for foodgram project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler, async views or async ORM, so the WSGI
+application runs behind asgiref's WsgiToAsgi bridge. Each request gets its
+own thread, as in Django's ASGIHandler, so a worker keeps serving other
+requests while one waits for the database. Run it with:
+
+    gunicorn foodgram.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import asyncio
+import os
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+
+class ThreadPerRequestWsgiToAsgi(WsgiToAsgi):
+    """
+    WSGI-приложение за ASGI: каждый запрос выполняется в своем потоке,
+    одновременно не больше max_requests запросов на процесс.
+    """
+
+    def __init__(self, wsgi_application, max_requests):
+        super().__init__(wsgi_application)
+        self.max_requests = max_requests
+        self.semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_requests)
+        async with self.semaphore, ThreadSensitiveContext():
+            await super().__call__(scope, receive, send)
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = ThreadPerRequestWsgiToAsgi(
+    get_wsgi_application(),
+    max_requests=int(os.getenv("ASGI_MAX_REQUESTS", default="32")),
+)
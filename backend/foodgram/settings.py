@@ -52,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "core.routers.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -100,6 +102,43 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения, например DB_REPLICA_HOST=db-replica.
+REPLICA_DATABASE = "replica"
+if os.getenv("DB_REPLICA_HOST") or os.getenv("DB_REPLICA_NAME"):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES["default"],
+        "NAME": os.getenv(
+            "DB_REPLICA_NAME", default=DATABASES["default"]["NAME"]
+        ),
+        "HOST": os.getenv(
+            "DB_REPLICA_HOST", default=DATABASES["default"]["HOST"]
+        ),
+        "PORT": os.getenv(
+            "DB_REPLICA_PORT", default=DATABASES["default"]["PORT"]
+        ),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+REPLICA_VIEWSETS = (
+    "api.views.RecipesViewSet",
+    "api.views.TagsViewSet",
+    "api.views.IngredientsViewSet",
+    "api.views.FollowViewSet",
+)
+REPLICA_STICKY_SECONDS = 10
+
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="foodgram"),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,7 +185,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend"
@@ -157,6 +196,44 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "api.paginations.LimitPageNumberPagination",
     "PAGE_SIZE": 6,
 }
+# Токен проверяется по кэшу процесса AUTH_TOKEN_LOCAL_TTL секунд,
+# по общему кэшу — AUTH_TOKEN_CACHE_TIMEOUT секунд.
+AUTH_TOKEN_LOCAL_TTL = 5
+AUTH_TOKEN_LOCAL_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
+INGREDIENTS_SEARCH_LIMIT = 50
+INGREDIENTS_INDEX_TTL = 300
+# Индексы рецептов в памяти процесса: применение изменений из БД
+# и полное перестроение, в секундах.
+RECIPES_INDEX_SYNC_INTERVAL = 10
+RECIPE_INGREDIENTS_INDEX_TTL = 600
+
+RECIPES_CACHE_TIMEOUT = 60
+RECIPES_BULK_LIMIT = 100
+RECIPES_COVERAGE_LIMIT = 200
+# Окно рейтинга и период полураспада вклада добавления, в часах.
+RECIPES_RANKINGS = {"popular": (30 * 24, 7 * 24), "trending": (48, 6)}
+RECIPES_RANKING_WEIGHTS = {"favorite": 1, "shopping_cart": 2}
+
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 50
+FEED_BATCH_SIZE = 500
+
+SIMILAR_RECIPES_LIMIT = 6
+SIMILAR_RECIPES_MAX_LIMIT = 20
+SIMILAR_INDEX_DIR = os.getenv(
+    "SIMILAR_INDEX_DIR", default=os.path.join(BASE_DIR, "similar_index")
+)
+
+RECIPE_IMAGE_SIZES = {"thumbnail": 160, "card": 480, "full": 1280}
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_WORKERS = 2
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
 
 DJOSER = {
     "LOGIN_FIELD": "email",
@@ -1,7 +1,44 @@
 from django.contrib import admin
 
 from .models import (FavouriteRecipes, Ingredients, IngredientsInRecipe,
-                     Recipes, ShoppingLists, Tags)
+                     Recipes, ShoppingLists, ShoppingListTotals, Tags)
+
+
+class ShoppingTotalsAdminMixin:
+    """
+    Пересчет сумм списков покупок после изменений в админке:
+    она сохраняет и удаляет строки в обход менеджеров и сериализаторов.
+    Метод totals_scope(obj) админки возвращает пользователей
+    и ингредиенты, суммы которых зависят от строки obj.
+    """
+
+    def refresh_totals(self, objs):
+        users, ingredients = set(), set()
+        for obj_users, obj_ingredients in objs:
+            users.update(obj_users)
+            ingredients.update(obj_ingredients)
+        if users and ingredients:
+            ShoppingListTotals.objects.refresh(users, ingredients)
+
+    def save_model(self, request, obj, form, change):
+        scopes = []
+        if change:
+            scopes.append(
+                self.totals_scope(self.model.objects.get(pk=obj.pk))
+            )
+        super().save_model(request, obj, form, change)
+        scopes.append(self.totals_scope(obj))
+        self.refresh_totals(scopes)
+
+    def delete_model(self, request, obj):
+        scope = self.totals_scope(obj)
+        super().delete_model(request, obj)
+        self.refresh_totals([scope])
+
+    def delete_queryset(self, request, queryset):
+        scopes = [self.totals_scope(obj) for obj in queryset]
+        super().delete_queryset(request, queryset)
+        self.refresh_totals(scopes)
 
 
 @admin.register(Tags)
@@ -22,25 +59,31 @@ class IngredientsAdmin(admin.ModelAdmin):
 
 
 @admin.register(IngredientsInRecipe)
-class IngredientsInRecipeAdmin(admin.ModelAdmin):
+class IngredientsInRecipeAdmin(ShoppingTotalsAdminMixin, admin.ModelAdmin):
     """В админке: отобр. и ред. ингредиентов в рецептах."""
 
     list_display = ("pk", "recipe", "ingredient", "amount")
     list_editable = ("recipe", "ingredient", "amount")
 
+    def totals_scope(self, obj):
+        users = ShoppingLists.objects.filter(recipe=obj.recipe_id)
+        return set(users.values_list("user", flat=True)), {obj.ingredient_id}
+
 
 @admin.register(Recipes)
 class RecipesAdmin(admin.ModelAdmin):
     """В админке: отобр. и ред., фильтр, поиск рецептов."""
 
-    list_display = ("pk", "name", "author")
+    list_display = ("pk", "name", "author", "count_favorites")
     list_editable = ("name",)
     list_filter = ("name", "author", "tags")
     readonly_fields = ("count_favorites",)
     search_fields = ("name", "author")
 
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    count_favorites.short_description = "В избранном"
 
 
 @admin.register(FavouriteRecipes)
@@ -53,9 +96,15 @@ class FavouriteRecipesAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShoppingLists)
-class ShoppingListAdmin(admin.ModelAdmin):
+class ShoppingListAdmin(ShoppingTotalsAdminMixin, admin.ModelAdmin):
     """В админке: поиск, отобр., ред. списка покупок."""
 
     list_display = ("pk", "user", "recipe")
     list_editable = ("user", "recipe")
     search_fields = ("user", "recipe")
+
+    def totals_scope(self, obj):
+        ingredients = IngredientsInRecipe.objects.filter(recipe=obj.recipe_id)
+        return {obj.user_id}, set(
+            ingredients.values_list("ingredient", flat=True)
+        )
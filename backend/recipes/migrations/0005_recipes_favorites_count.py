@@ -0,0 +1,29 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:22
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_favorites_count(apps, schema_editor):
+    Recipes = apps.get_model("recipes", "Recipes")
+    recipes = Recipes.objects.annotate(total=Count("favourites"))
+    for recipe in recipes.filter(total__gt=0):
+        Recipes.objects.filter(pk=recipe.pk).update(
+            favorites_count=recipe.total
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_shoppinglisttotals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_favorites_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:25
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_modified(apps, schema_editor):
+    Recipes = apps.get_model("recipes", "Recipes")
+    Recipes.objects.update(modified=F("pud_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipes_favorites_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersions',
+            fields=[
+                ('table', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Таблица')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия')),
+                ('modified', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия таблицы',
+                'verbose_name_plural': 'Версии таблиц',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_modified, migrations.RunPython.noop),
+    ]
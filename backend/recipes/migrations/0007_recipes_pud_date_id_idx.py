@@ -0,0 +1,17 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipes_modified_tableversions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['-pud_date', '-id'], name='recipes_pud_date_id_idx'),
+        ),
+    ]
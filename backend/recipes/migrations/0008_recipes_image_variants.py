@@ -0,0 +1,28 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipes_pud_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image_card',
+            field=models.ImageField(blank=True, null=True, upload_to='image_recipes/variants/', verbose_name='Картинка для карточки'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='image_full',
+            field=models.ImageField(blank=True, null=True, upload_to='image_recipes/variants/', verbose_name='Картинка в полном размере'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='image_recipes/variants/', verbose_name='Миниатюра'),
+        ),
+    ]
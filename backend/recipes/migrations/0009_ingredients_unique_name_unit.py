@@ -0,0 +1,69 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:30
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredients = apps.get_model("recipes", "Ingredients")
+    IngredientsInRecipe = apps.get_model("recipes", "IngredientsInRecipe")
+    ShoppingLists = apps.get_model("recipes", "ShoppingLists")
+    ShoppingListTotals = apps.get_model("recipes", "ShoppingListTotals")
+    groups = (
+        Ingredients.objects.values("name", "measurement_unit")
+        .annotate(keeper=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    keepers = []
+    for group in groups:
+        keeper = group["keeper"]
+        keepers.append(keeper)
+        duplicates = Ingredients.objects.filter(
+            name=group["name"], measurement_unit=group["measurement_unit"]
+        ).exclude(pk=keeper)
+        for row in IngredientsInRecipe.objects.filter(
+            ingredient__in=duplicates
+        ):
+            merged = IngredientsInRecipe.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=keeper
+            ).update(amount=F("amount") + row.amount)
+            if merged:
+                row.delete()
+            else:
+                row.ingredient_id = keeper
+                row.save(update_fields=("ingredient",))
+        duplicates.delete()
+    if not keepers:
+        return
+    ShoppingListTotals.objects.filter(ingredient__in=keepers).delete()
+    ShoppingListTotals.objects.bulk_create(
+        ShoppingListTotals(
+            user_id=row["user"],
+            ingredient_id=row["recipe__ingredients_amount__ingredient"],
+            total=row["total"],
+        )
+        for row in ShoppingLists.objects.filter(
+            recipe__ingredients_amount__ingredient__in=keepers
+        )
+        .values("user", "recipe__ingredients_amount__ingredient")
+        .annotate(total=Sum("recipe__ingredients_amount__amount"))
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipes_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredients',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_unit'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+SEARCH_CONFIG = "russian"
+
+POSTGRESQL_FORWARD = (
+    "ALTER TABLE recipes_recipes ADD COLUMN search_vector tsvector",
+    f"""
+    CREATE FUNCTION recipes_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER recipes_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipes
+    FOR EACH ROW EXECUTE PROCEDURE recipes_search_vector_update()
+    """,
+    "UPDATE recipes_recipes SET name = name",
+    "CREATE INDEX recipes_search_vector_idx "
+    "ON recipes_recipes USING GIN (search_vector)",
+)
+POSTGRESQL_BACKWARD = (
+    "DROP TRIGGER recipes_search_vector_trigger ON recipes_recipes",
+    "DROP FUNCTION recipes_search_vector_update()",
+    "ALTER TABLE recipes_recipes DROP COLUMN search_vector",
+)
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE recipes_recipes_fts USING fts5("
+    "name, text, content='recipes_recipes', content_rowid='id')",
+    """
+    CREATE TRIGGER recipes_recipes_fts_insert
+    AFTER INSERT ON recipes_recipes BEGIN
+        INSERT INTO recipes_recipes_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipes_fts_delete
+    AFTER DELETE ON recipes_recipes BEGIN
+        INSERT INTO recipes_recipes_fts (recipes_recipes_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipes_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipes BEGIN
+        INSERT INTO recipes_recipes_fts (recipes_recipes_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipes_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    "INSERT INTO recipes_recipes_fts (recipes_recipes_fts) VALUES ('rebuild')",
+)
+SQLITE_BACKWARD = (
+    "DROP TRIGGER IF EXISTS recipes_recipes_fts_insert",
+    "DROP TRIGGER IF EXISTS recipes_recipes_fts_delete",
+    "DROP TRIGGER IF EXISTS recipes_recipes_fts_update",
+    "DROP TABLE recipes_recipes_fts",
+)
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement, params=None)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredients_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements(
+                {
+                    "postgresql": POSTGRESQL_FORWARD,
+                    "sqlite": SQLITE_FORWARD,
+                }
+            ),
+            run_statements(
+                {
+                    "postgresql": POSTGRESQL_BACKWARD,
+                    "sqlite": SQLITE_BACKWARD,
+                }
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_feedentries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipes',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+    ]
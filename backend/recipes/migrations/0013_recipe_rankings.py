@@ -0,0 +1,58 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:52
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_created(apps, schema_editor):
+    # Время добавления прежних связей неизвестно: дата публикации
+    # рецепта не дает считать их новыми в рейтинге trending.
+    Recipes = apps.get_model("recipes", "Recipes")
+    pud_date = Subquery(
+        Recipes.objects.filter(pk=OuterRef("recipe")).values("pud_date")[:1]
+    )
+    for name in ("FavouriteRecipes", "ShoppingLists"):
+        apps.get_model("recipes", name).objects.update(created=pud_date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipes_modified_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRankings',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.Recipes', verbose_name='Рецепт')),
+                ('popular', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Набирает популярность')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favouriterecipes',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglists',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperankings',
+            index=models.Index(fields=['-popular', '-recipe'], name='ranking_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperankings',
+            index=models.Index(fields=['-trending', '-recipe'], name='ranking_trending_idx'),
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+    ]
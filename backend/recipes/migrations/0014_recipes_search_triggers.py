@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# AlterField в 0012 на SQLite пересоздает таблицу recipes_recipes
+# вместе с ее триггерами, и таблица FTS5 из 0010 перестает обновляться.
+# Любая следующая миграция, пересоздающая таблицу на SQLite, должна
+# так же восстанавливать триггеры.
+SQLITE_FORWARD = (
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_recipes_fts_insert
+    AFTER INSERT ON recipes_recipes BEGIN
+        INSERT INTO recipes_recipes_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_recipes_fts_delete
+    AFTER DELETE ON recipes_recipes BEGIN
+        INSERT INTO recipes_recipes_fts (recipes_recipes_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_recipes_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipes BEGIN
+        INSERT INTO recipes_recipes_fts (recipes_recipes_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipes_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    "INSERT INTO recipes_recipes_fts (recipes_recipes_fts) VALUES ('rebuild')",
+)
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in SQLITE_FORWARD:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_rankings'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,16 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from core.managers import LinkManager
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from users.models import Follow, UserCounters
 
 User = get_user_model()
 
@@ -53,6 +63,12 @@ class Ingredients(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ("name",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_unit",
+            )
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.measurement_unit}."
@@ -77,6 +93,24 @@ class Recipes(models.Model):
         null=True,
         upload_to="image_recipes/",
     )
+    image_thumbnail = models.ImageField(
+        verbose_name="Миниатюра",
+        blank=True,
+        null=True,
+        upload_to="image_recipes/variants/",
+    )
+    image_card = models.ImageField(
+        verbose_name="Картинка для карточки",
+        blank=True,
+        null=True,
+        upload_to="image_recipes/variants/",
+    )
+    image_full = models.ImageField(
+        verbose_name="Картинка в полном размере",
+        blank=True,
+        null=True,
+        upload_to="image_recipes/variants/",
+    )
     name = models.CharField(verbose_name="Название рецепта", max_length=200)
     author = models.ForeignKey(
         User,
@@ -94,11 +128,22 @@ class Recipes(models.Model):
     pud_date = models.DateTimeField(
         verbose_name="Дата публикации", auto_now_add=True
     )
+    modified = models.DateTimeField(
+        verbose_name="Дата изменения", auto_now=True, db_index=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="В избранном", default=0, db_index=True
+    )
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pud_date",)
+        indexes = [
+            models.Index(
+                fields=("-pud_date", "-id"), name="recipes_pud_date_id_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.name}"
@@ -141,6 +186,18 @@ class IngredientsInRecipe(models.Model):
         return f"{self.ingredient.name} - {self.amount}"
 
 
+class FavouriteRecipesManager(LinkManager):
+    """Избранное вместе со счетчиками favorites_count рецептов."""
+
+    target = "recipe"
+
+    def links_changed(self, user_id, targets, delta):
+        recipes = Recipes.objects.filter(id__in=targets)
+        if delta < 0:
+            recipes = recipes.filter(favorites_count__gt=0)
+        recipes.update(favorites_count=F("favorites_count") + delta)
+
+
 class FavouriteRecipes(models.Model):
     """Модель для любимых рецептов."""
 
@@ -156,6 +213,11 @@ class FavouriteRecipes(models.Model):
         related_name="favourites",
         verbose_name="Рецепт",
     )
+    created = models.DateTimeField(
+        verbose_name="Дата добавления", default=timezone.now, db_index=True
+    )
+
+    objects = FavouriteRecipesManager()
 
     class Meta:
         verbose_name = "Избранный рецепт"
@@ -171,6 +233,20 @@ class FavouriteRecipes(models.Model):
         return f"{self.user} - {self.recipe.name}"
 
 
+class ShoppingListsManager(LinkManager):
+    """Списки покупок вместе с суммами ингредиентов."""
+
+    target = "recipe"
+
+    def links_changed(self, user_id, targets, delta):
+        ShoppingListTotals.objects.refresh(
+            [user_id],
+            IngredientsInRecipe.objects.filter(recipe__in=targets).values(
+                "ingredient"
+            ),
+        )
+
+
 class ShoppingLists(models.Model):
     """Модель для списков покупок."""
 
@@ -186,6 +262,11 @@ class ShoppingLists(models.Model):
         related_name="list",
         verbose_name="Рецепт",
     )
+    created = models.DateTimeField(
+        verbose_name="Дата добавления", default=timezone.now, db_index=True
+    )
+
+    objects = ShoppingListsManager()
 
     class Meta:
         verbose_name = "Список покупок"
@@ -196,3 +277,377 @@ class ShoppingLists(models.Model):
                 fields=("user", "recipe"), name="unique_list_user"
             )
         ]
+
+
+class ShoppingListTotalsManager(models.Manager):
+    """Поддержка сумм ингредиентов в списках покупок."""
+
+    @staticmethod
+    def aggregate_lists(**filters):
+        """Суммы ингредиентов по исходным спискам покупок."""
+        return (
+            ShoppingLists.objects.filter(**filters)
+            .values("user", "recipe__ingredients_amount__ingredient")
+            .annotate(total=Sum("recipe__ingredients_amount__amount"))
+            .order_by()
+        )
+
+    @transaction.atomic()
+    def refresh(self, users, ingredients):
+        """
+        Пересчитать суммы для пар пользователь/ингредиент. Строки
+        пользователей блокируются, чтобы параллельные пересчеты
+        не вставляли одни и те же суммы.
+        """
+        list(
+            User.objects.select_for_update()
+            .filter(id__in=users)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.filter(user__in=users, ingredient__in=ingredients).delete()
+        self.bulk_create(
+            self.model(
+                user_id=row["user"],
+                ingredient_id=row["recipe__ingredients_amount__ingredient"],
+                total=row["total"],
+            )
+            for row in self.aggregate_lists(
+                user__in=users,
+                recipe__ingredients_amount__ingredient__in=ingredients,
+            )
+        )
+
+
+class ShoppingListTotals(models.Model):
+    """Суммы ингредиентов в списке покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="list_totals",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name="list_totals",
+        verbose_name="Ингредиент",
+    )
+    total = models.PositiveIntegerField(verbose_name="Общее количество")
+
+    objects = ShoppingListTotalsManager()
+
+    class Meta:
+        verbose_name = "Сумма ингредиента в списке покупок"
+        verbose_name_plural = "Суммы ингредиентов в списках покупок"
+        ordering = ("user", "ingredient")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"), name="unique_list_total"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.ingredient.name} - {self.total}"
+
+
+class TableVersionsManager(models.Manager):
+    """Версии таблиц-справочников для условных GET-запросов."""
+
+    def bump(self, table):
+        """Увеличить версию таблицы table."""
+        updated = self.filter(table=table).update(
+            version=F("version") + 1, modified=timezone.now()
+        )
+        if not updated:
+            self.get_or_create(table=table)
+
+    def stamp(self, table):
+        """Версия и время изменения таблицы table."""
+        version, _ = self.get_or_create(table=table)
+        return version.version, version.modified
+
+
+class TableVersions(models.Model):
+    """Версия таблицы, растет при каждом изменении ее строк."""
+
+    table = models.CharField(
+        verbose_name="Таблица", max_length=50, primary_key=True
+    )
+    version = models.PositiveIntegerField(verbose_name="Версия", default=1)
+    modified = models.DateTimeField(
+        verbose_name="Дата изменения", auto_now=True
+    )
+
+    objects = TableVersionsManager()
+
+    class Meta:
+        verbose_name = "Версия таблицы"
+        verbose_name_plural = "Версии таблиц"
+
+    def __str__(self):
+        return f"{self.table}: {self.version}"
+
+
+def chunks(iterable, size):
+    """Списки по size элементов из iterable."""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def before_position(queryset, field, position):
+    """Строки после курсора position = (дата, id) при обратной сортировке."""
+    if position is None:
+        return queryset
+    pud_date, pk = position
+    return queryset.filter(
+        Q(pud_date__lt=pud_date) | Q(pud_date=pud_date, **{f"{field}__lt": pk})
+    )
+
+
+class FeedEntriesManager(models.Manager):
+    """
+    Ленты подписок. Рецепт раскладывается по лентам подписчиков при
+    публикации, рецепты авторов с большим числом подписчиков
+    подмешиваются при чтении.
+    """
+
+    @staticmethod
+    def heavy(authors):
+        """Авторы из authors, рецепты которых не раскладываются по лентам."""
+        return UserCounters.objects.filter(
+            user__in=authors, followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list("user", flat=True)
+
+    def insert(self, users, recipes):
+        """Добавить рецепты (id, автор, дата) в ленты users пачками."""
+        entries = (
+            self.model(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pud_date=pud_date,
+            )
+            for user_id in users
+            for recipe_id, author_id, pud_date in recipes
+        )
+        for batch in chunks(entries, settings.FEED_BATCH_SIZE):
+            self.bulk_create(batch, ignore_conflicts=True)
+
+    def fan_out(self, recipe):
+        """Разложить новый рецепт по лентам подписчиков автора."""
+        if self.heavy([recipe.author_id]).exists():
+            return
+        self.insert(
+            list(
+                Follow.objects.filter(author=recipe.author_id).values_list(
+                    "user", flat=True
+                )
+            ),
+            [(recipe.pk, recipe.author_id, recipe.pud_date)],
+        )
+
+    def backfill(self, users, author_id):
+        """Последние рецепты автора в ленты users."""
+        recipes = list(
+            Recipes.objects.filter(author=author_id)
+            .order_by("-pud_date", "-id")
+            .values_list("id", "author", "pud_date")[
+                : settings.FEED_BACKFILL_LIMIT
+            ]
+        )
+        if recipes:
+            self.insert(users, recipes)
+
+    def prune(self, user_id, author_id):
+        """Убрать рецепты автора из ленты пользователя пачками."""
+        entries = self.filter(user=user_id, author=author_id)
+        while True:
+            ids = list(
+                entries.values_list("id", flat=True)[
+                    : settings.FEED_BATCH_SIZE
+                ]
+            )
+            if not ids:
+                return
+            self.filter(id__in=ids).delete()
+
+    def followed(self, user_id, author_id):
+        """Подписка: рецепты автора попадают в ленту, если он не тяжелый."""
+        if not self.heavy([author_id]).exists():
+            self.backfill([user_id], author_id)
+
+    def unfollowed(self, user_id, author_id):
+        """
+        Отписка. Если автор перестал быть тяжелым, его рецепты больше не
+        подмешиваются при чтении и раскладываются по лентам подписчиков.
+        """
+        self.prune(user_id, author_id)
+        if UserCounters.objects.filter(
+            user=author_id, followers_count=settings.FEED_FANOUT_LIMIT
+        ).exists():
+            self.backfill(
+                list(
+                    Follow.objects.filter(author=author_id).values_list(
+                        "user", flat=True
+                    )
+                ),
+                author_id,
+            )
+
+    def page(self, user, limit, position=None):
+        """
+        Пары (дата, id рецепта) страницы ленты после курсора position.
+        Лента читается одним проходом по индексу пользователя.
+        """
+        entries = list(
+            before_position(self.filter(user=user), "recipe", position)
+            .order_by("-pud_date", "-recipe_id")
+            .values_list("pud_date", "recipe")[:limit]
+        )
+        heavy = list(self.heavy(user.follower.values("author")))
+        if heavy:
+            entries += before_position(
+                Recipes.objects.filter(author__in=heavy), "id", position
+            ).order_by("-pud_date", "-id").values_list("pud_date", "id")[
+                :limit
+            ]
+            return sorted(set(entries), reverse=True)[:limit]
+        return entries
+
+
+class FeedEntries(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    pud_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    objects = FeedEntriesManager()
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи лент"
+        ordering = ("user", "-pud_date", "-recipe_id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-pud_date", "-recipe"),
+                name="feed_user_pud_date_idx",
+            ),
+            models.Index(
+                fields=("user", "author"), name="feed_user_author_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.recipe}"
+
+
+class RecipeRankingsManager(models.Manager):
+    """Рейтинги рецептов, пересчитываемые периодически."""
+
+    @staticmethod
+    def scores(now):
+        """
+        Рейтинги по добавлениям в избранное и список покупок: вклад
+        каждого добавления в окне рейтинга убывает вдвое за период
+        полураспада. Добавления сгруппированы по часам.
+        """
+        rankings = settings.RECIPES_RANKINGS
+        since = now - timedelta(
+            hours=max(window for window, _ in rankings.values())
+        )
+        scores = defaultdict(lambda: dict.fromkeys(rankings, 0.0))
+        for model, weight in (
+            (FavouriteRecipes, settings.RECIPES_RANKING_WEIGHTS["favorite"]),
+            (ShoppingLists, settings.RECIPES_RANKING_WEIGHTS["shopping_cart"]),
+        ):
+            rows = (
+                model.objects.filter(created__gte=since)
+                .annotate(hour=TruncHour("created"))
+                .values("recipe", "hour")
+                .annotate(total=Count("id"))
+                .order_by()
+                .values_list("recipe", "hour", "total")
+            )
+            for recipe_id, hour, total in rows.iterator():
+                age = max((now - hour).total_seconds() / 3600, 0)
+                for name, (window, half_life) in rankings.items():
+                    if age <= window:
+                        scores[recipe_id][name] += (
+                            weight * total * 0.5 ** (age / half_life)
+                        )
+        return scores
+
+    def refresh(self, now=None):
+        """Пересчитать рейтинги. Возвращает число рецептов в рейтинге."""
+        scores = self.scores(now or timezone.now())
+        with transaction.atomic():
+            existing = Recipes.objects.filter(id__in=list(scores))
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(recipe_id=recipe_id, **scores[recipe_id])
+                    for recipe_id in existing.values_list("id", flat=True)
+                ),
+                batch_size=500,
+            )
+        return self.count()
+
+
+class RecipeRankings(models.Model):
+    """Рейтинг рецепта по добавлениям в избранное и список покупок."""
+
+    recipe = models.OneToOneField(
+        Recipes,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ranking",
+        verbose_name="Рецепт",
+    )
+    popular = models.FloatField(verbose_name="Популярность", default=0)
+    trending = models.FloatField(
+        verbose_name="Набирает популярность", default=0
+    )
+
+    objects = RecipeRankingsManager()
+
+    class Meta:
+        verbose_name = "Рейтинг рецепта"
+        verbose_name_plural = "Рейтинги рецептов"
+        indexes = [
+            models.Index(
+                fields=("-popular", "-recipe"), name="ranking_popular_idx"
+            ),
+            models.Index(
+                fields=("-trending", "-recipe"), name="ranking_trending_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} - {self.popular:.2f} / {self.trending:.2f}"
@@ -0,0 +1,68 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    FavouriteRecipes,
+    FeedEntries,
+    Ingredients,
+    Recipes,
+    ShoppingListTotals,
+    TableVersions,
+    Tags,
+)
+
+
+@receiver(post_save, sender=FavouriteRecipes)
+def count_created_favorite(instance, created, raw=False, **kwargs):
+    """Рецепт добавлен в избранное."""
+    if created and not raw:
+        Recipes.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F("favorites_count") + 1
+        )
+
+
+@receiver(post_delete, sender=FavouriteRecipes)
+def count_deleted_favorite(instance, **kwargs):
+    """Рецепт убран из избранного."""
+    Recipes.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F("favorites_count") - 1)
+
+
+@receiver(post_save, sender=Recipes)
+def fan_out_recipe(instance, created, raw=False, **kwargs):
+    """Новый рецепт попадает в ленты подписчиков автора."""
+    if created and not raw:
+        FeedEntries.objects.fan_out(instance)
+
+
+@receiver(pre_delete, sender=Recipes)
+def collect_shopping_lists(instance, **kwargs):
+    """Списки покупок и ингредиенты рецепта до каскадного удаления."""
+    instance.shopping_list_users = list(
+        instance.list.values_list("user", flat=True)
+    )
+    instance.shopping_list_ingredients = list(
+        instance.ingredients_amount.values_list("ingredient", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipes)
+def refresh_shopping_totals(instance, **kwargs):
+    """
+    Суммы списков покупок без удаленного рецепта, в том числе
+    при удалении через админку или ORM.
+    """
+    users = getattr(instance, "shopping_list_users", None)
+    if users:
+        ShoppingListTotals.objects.refresh(
+            users, instance.shopping_list_ingredients
+        )
+
+
+@receiver((post_save, post_delete), sender=Tags)
+@receiver((post_save, post_delete), sender=Ingredients)
+def bump_table_version(sender, **kwargs):
+    """Новая версия справочника при любом изменении."""
+    TableVersions.objects.bump(sender._meta.db_table)
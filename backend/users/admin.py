@@ -8,8 +8,21 @@ from .models import Follow
 class CustomUserAdmin(UserAdmin):
     """В админке: отобр. и фильтр полей User."""
 
-    list_display = ("email", "username")
+    list_display = ("email", "username", "recipes_count", "followers_count")
     list_filter = ("email", "username")
+    list_select_related = ("counters",)
+
+    def recipes_count(self, obj):
+        counters = getattr(obj, "counters", None)
+        return counters.recipes_count if counters else 0
+
+    recipes_count.short_description = "Рецептов"
+
+    def followers_count(self, obj):
+        counters = getattr(obj, "counters", None)
+        return counters.followers_count if counters else 0
+
+    followers_count.short_description = "Подписчиков"
 
 
 @admin.register(Follow)
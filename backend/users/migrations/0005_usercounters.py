@@ -0,0 +1,51 @@
+# Generated by Django 2.2.27 on 2026-10-17 04:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    UserCounters = apps.get_model("users", "UserCounters")
+    users = User.objects.annotate(
+        total_recipes=Count("recipes", distinct=True),
+        total_followers=Count("following", distinct=True),
+    )
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(
+                user=user,
+                recipes_count=user.total_recipes,
+                followers_count=user.total_followers,
+            )
+            for user in users
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('recipes', '0001_initial'),
+        ('users', '0004_auto_20230330_1818'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Количество рецептов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
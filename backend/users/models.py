@@ -1,9 +1,32 @@
+from core.managers import LinkManager
+from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F
 
 User = get_user_model()
 
 
+class FollowManager(LinkManager):
+    """Подписки вместе со счетчиками подписчиков и лентами."""
+
+    target = "author"
+
+    def link(self, user, target):
+        if self.prepare(target) == user.pk:
+            return False
+        return super().link(user, target)
+
+    def links_changed(self, user_id, targets, delta):
+        feed = apps.get_model("recipes", "FeedEntries").objects
+        for author_id in targets:
+            UserCounters.objects.change(author_id, "followers_count", delta)
+            if delta > 0:
+                feed.followed(user_id, author_id)
+            else:
+                feed.unfollowed(user_id, author_id)
+
+
 class Follow(models.Model):
     """Модель для подписки на авторов."""
 
@@ -20,6 +43,8 @@ class Follow(models.Model):
         verbose_name="Автор",
     )
 
+    objects = FollowManager()
+
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
@@ -40,3 +65,44 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"Подписчик {self.user} - автор {self.author}"
+
+
+class UserCountersManager(models.Manager):
+    """Изменение счетчиков пользователя одним UPDATE."""
+
+    def change(self, user_id, field, delta):
+        """Изменить счетчик field на delta в текущей транзакции."""
+        queryset = self.filter(user_id=user_id)
+        if delta < 0:
+            queryset = queryset.filter(**{f"{field}__gte": -delta})
+        updated = queryset.update(**{field: F(field) + delta})
+        if not updated and delta > 0:
+            self.get_or_create(user_id=user_id)
+            self.filter(user_id=user_id).update(**{field: F(field) + delta})
+
+
+class UserCounters(models.Model):
+    """Денормализованные счетчики автора."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counters",
+        verbose_name="Пользователь",
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="Количество рецептов", default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Количество подписчиков", default=0
+    )
+
+    objects = UserCountersManager()
+
+    class Meta:
+        verbose_name = "Счетчики пользователя"
+        verbose_name_plural = "Счетчики пользователей"
+
+    def __str__(self):
+        return f"{self.user}: {self.recipes_count}/{self.followers_count}"
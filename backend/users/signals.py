@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import FeedEntries, Recipes
+
+from .models import Follow, UserCounters
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(instance, created, raw=False, **kwargs):
+    """Счетчики создаются вместе с пользователем."""
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Recipes)
+def count_created_recipe(instance, created, raw=False, **kwargs):
+    """Новый рецепт автора."""
+    if created and not raw:
+        UserCounters.objects.change(instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipes)
+def count_deleted_recipe(instance, **kwargs):
+    """Удаленный рецепт автора."""
+    UserCounters.objects.change(instance.author_id, "recipes_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(instance, created, raw=False, **kwargs):
+    """Новый подписчик автора."""
+    if created and not raw:
+        UserCounters.objects.change(instance.author_id, "followers_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(instance, **kwargs):
+    """Отписка от автора."""
+    UserCounters.objects.change(instance.author_id, "followers_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+def fill_feed(instance, created, raw=False, **kwargs):
+    """Рецепты автора в ленте нового подписчика, после счетчиков."""
+    if created and not raw:
+        FeedEntries.objects.followed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(instance, **kwargs):
+    """Рецепты автора убираются из ленты отписавшегося."""
+    FeedEntries.objects.unfollowed(instance.user_id, instance.author_id)